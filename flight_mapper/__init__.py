@@ -1,3 +1,13 @@
 from .read_data import *
 from .plot import *
 from .html import *
+from .store import *
+from .pages import *
+from .geojson import *
+from .tiles import *
+from .search import *
+from .arrow import *
+from .network import *
+from .images import *
+from .geometry import *
+from .batch import *
@@ -0,0 +1,237 @@
+import os
+
+from .read_data import gc_distance
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+# Number of rows built in memory before they are written out
+batch_size = 10000
+
+
+def _schemas():
+    """Column types of the flights, legs and airports tables."""
+    pa = pyarrow
+    text = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'flights': pa.schema([('id', pa.int32()),
+                              ('date', pa.date32()),
+                              ('desig', text),
+                              ('number', pa.string()),
+                              ('mkt_cxr', text),
+                              ('adm_cxr', text),
+                              ('route', pa.string()),
+                              ('origin', text),
+                              ('destination', text),
+                              ('distance', pa.float64()),
+                              ('registration', text),
+                              ('msn', pa.string()),
+                              ('ln', pa.string()),
+                              ('manufacturer', text),
+                              ('type2', text),
+                              ('type3', text),
+                              ('first_flight', pa.string()),
+                              ('num_engines', pa.int8()),
+                              ('engines', text),
+                              ('seat_type', text),
+                              ('cabin', text),
+                              ('seat', pa.string()),
+                              ('std', pa.string()),
+                              ('sta', pa.string()),
+                              ('atd', pa.string()),
+                              ('ata', pa.string())]),
+        'legs': pa.schema([('flight_id', pa.int32()),
+                           ('leg', pa.int16()),
+                           ('origin', text),
+                           ('destination', text),
+                           ('scheduled', pa.bool_()),
+                           ('diverted', pa.bool_()),
+                           ('distance', pa.float64())]),
+        'airports': pa.schema([('code', pa.string()),
+                               ('iata', pa.string()),
+                               ('icao', pa.string()),
+                               ('name', pa.string()),
+                               ('lat', pa.float64()),
+                               ('lon', pa.float64()),
+                               ('elevation', pa.float64()),
+                               ('city', text),
+                               ('region', text),
+                               ('country', text),
+                               ('continent', text)]),
+    }
+
+
+def _blank(value):
+    """None for the missing values read_airports fills with ''."""
+    return None if value == '' else value
+
+
+def flight_rows(flights):
+    """Rows of the flights table, one per flight in the order of the log."""
+    for i, flight in enumerate(flights):
+        landed = [code for code, airport_type in flight.route_nodes if airport_type != 'scheduled']
+        yield {'id': i,
+               'date': flight.date.date(),
+               'desig': flight.desig,
+               'number': flight.number,
+               'mkt_cxr': flight.mkt_cxr,
+               'adm_cxr': flight.adm_cxr or None,
+               'route': flight.route_string,
+               'origin': landed[0],
+               'destination': landed[-1],
+               'distance': flight.distance,
+               'registration': flight.registration,
+               'msn': flight.msn,
+               'ln': flight.ln,
+               'manufacturer': flight.manufacturer,
+               'type2': flight.type2,
+               'type3': flight.type3,
+               'first_flight': flight.first_flight,
+               'num_engines': None if flight.num_engines is None else int(flight.num_engines),
+               'engines': flight.engines,
+               'seat_type': flight.seat_type,
+               'cabin': _blank(flight.cabin),
+               'seat': flight.seat,
+               'std': flight.std,
+               'sta': flight.sta,
+               'atd': flight.atd,
+               'ata': flight.ata}
+
+
+def leg_rows(flights):
+    """Rows of the legs table, one per segment flown.
+
+    scheduled is set on a leg which passed over stops that were scheduled
+    but never landed at, and diverted on a leg which ended at a diversion.
+    """
+    for i, flight in enumerate(flights):
+        nodes = flight.route_nodes
+        origin = nodes[0][0]
+        skipped = False
+        leg = 0
+        for code, airport_type in nodes[1:]:
+            if airport_type == 'scheduled':
+                skipped = True
+                continue
+            yield {'flight_id': i,
+                   'leg': leg,
+                   'origin': origin,
+                   'destination': code,
+                   'scheduled': skipped,
+                   'diverted': airport_type == 'diverted',
+                   'distance': gc_distance(flight.airports[origin], flight.airports[code])}
+            origin = code
+            skipped = False
+            leg += 1
+
+
+def airport_rows(airports):
+    """Rows of the airports table."""
+    for airport in airports.values():
+        yield {'code': airport.code,
+               'iata': _blank(airport.iata),
+               'icao': _blank(airport.icao),
+               'name': _blank(airport.name),
+               'lat': airport.lat,
+               'lon': airport.lon,
+               'elevation': _blank(airport.elevation),
+               'city': _blank(airport.city),
+               'region': _blank(airport.region),
+               'country': _blank(airport.country),
+               'continent': _blank(airport.continent)}
+
+
+def _record_batch(rows, schema, dictionaries):
+    """Build a RecordBatch from a list of row dicts.
+
+    Dictionary columns share one growing dictionary per column across all
+    the batches of a table, so that each batch only adds to the dictionary
+    of the one before and the Arrow IPC file format can store it as deltas.
+    """
+    pa = pyarrow
+    columns = []
+    for field in schema:
+        values = [row[field.name] for row in rows]
+        if pa.types.is_dictionary(field.type):
+            seen = dictionaries.setdefault(field.name, {})
+            indices = [None if value is None else seen.setdefault(value, len(seen))
+                       for value in values]
+            columns.append(pa.DictionaryArray.from_arrays(
+                pa.array(indices, type=field.type.index_type),
+                pa.array(list(seen), type=field.type.value_type)))
+        else:
+            columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _write_table(path, rows, schema, file_format):
+    pa = pyarrow
+    if file_format == 'parquet':
+        writer = pa.parquet.ParquetWriter(path, schema)
+    else:
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        writer = pa.ipc.new_file(path, schema, options=options)
+
+    dictionaries = {}
+    batch = []
+    written = 0
+    with writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                writer.write_batch(_record_batch(batch, schema, dictionaries))
+                written += len(batch)
+                batch = []
+        if batch or written == 0:
+            writer.write_batch(_record_batch(batch, schema, dictionaries))
+
+
+def export_arrow(flights, airports, outdir, file_format='parquet'):
+    """Write the flights, legs and airports as Parquet or Arrow IPC files.
+
+    Other tools can then load the log directly, with dates, distances and
+    engine counts typed, and repeated strings such as carriers and airport
+    codes dictionary encoded, rather than re-parsing the flights list and
+    route strings. The tables are built and written batch_size rows at a
+    time. Rows of legs refer to flights by flights.id, and airports by
+    airports.code.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    airports : dict
+        Airports database dict
+    outdir : str
+        directory to write the files to
+    file_format : str
+        'parquet' to write flights.parquet etc, or 'arrow' to write Arrow IPC
+        files flights.arrow etc, which can be memory mapped
+
+    Returns
+    -------
+    list
+        paths of the files written
+    """
+    if pyarrow is None:
+        raise ImportError('export_arrow requires pyarrow, install flight_mapper[arrow]')
+    if file_format not in ('parquet', 'arrow'):
+        raise ValueError(f'Unknown file format {file_format}')
+    os.makedirs(outdir, exist_ok=True)
+
+    schemas = _schemas()
+    tables = {'flights': flight_rows(flights),
+              'legs': leg_rows(flights),
+              'airports': airport_rows(airports)}
+
+    paths = []
+    for name, rows in tables.items():
+        path = os.path.join(outdir, f'{name}.{file_format}')
+        _write_table(path, rows, schemas[name], file_format)
+        paths.append(path)
+    return paths
@@ -0,0 +1,134 @@
+import importlib
+import multiprocessing
+import os
+import time
+import traceback
+
+from .read_data import read_airports
+from .build import site_graph
+
+
+# State of each batch worker process, set once by _init_worker and shared by
+# every site the worker builds
+_shared = {}
+
+
+def batch_users(paths):
+    """Name the owner of each flights list.
+
+    A list called flights.txt is named after the directory holding it, eg
+    logs/alice/flights.txt is alice's, and any other list after its file
+    name, eg logs/bob.txt is bob's.
+
+    Parameters
+    ----------
+    paths : list
+        file paths of flights lists
+
+    Returns
+    -------
+    dict
+        keys = user names, values = file paths
+    """
+    users = {}
+    for path in paths:
+        if os.path.basename(path) == 'flights.txt':
+            user = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        else:
+            user = os.path.splitext(os.path.basename(path))[0]
+        if user in users:
+            raise ValueError(f'Both {users[user]} and {path} belong to user {user}')
+        users[user] = path
+    return users
+
+
+def _init_worker(airports, cache_dir):
+    # matplotlib, cartopy and the basemap geometry are loaded once per
+    # worker rather than once per site
+    import matplotlib
+    matplotlib.use('Agg')
+    # Imported only so that each site's maps do not pay for loading it
+    importlib.import_module('.plot', __package__)
+    from .geometry import views, view_features, load_geometry
+
+    for view in views:
+        for feature in view_features(view):
+            load_geometry(view, feature, cache_dir)
+
+    _shared['airports'] = airports
+    _shared['geometry'] = cache_dir
+
+
+def _build_user(job):
+    user, flights_file, airports_file, outdir, root = job
+    start = time.perf_counter()
+    try:
+        pictures = os.path.join(os.path.dirname(flights_file), 'pictures')
+        graph = site_graph(flights_file, airports_file, outdir, root,
+                           pictures=pictures, processes=1)
+        # The worker is itself one of many running at once, so each site is
+        # built one task at a time, in this process
+        graph.run(jobs=1, processes=False,
+                  results={'airports': _shared['airports'], 'geometry': _shared['geometry']})
+    except Exception:
+        return user, traceback.format_exc(), time.perf_counter() - start
+    return user, None, time.perf_counter() - start
+
+
+def batch_build(logs,
+                airports_file='data/airports.csv',
+                outdir='public',
+                root='.',
+                processes=None):
+    """Build the sites of many users with one pool of worker processes.
+
+    The airports are read and the basemap geometry cache is warmed once
+    for the whole batch, and each worker loads them along with matplotlib
+    and cartopy when it starts, so building another site only costs the
+    work which is particular to that user's flights. Each site is written
+    to outdir/<user>/, and the pictures directory next to a user's flights
+    list, if there is one, is copied into it. A site which fails to build
+    is reported and does not stop the others.
+
+    Parameters
+    ----------
+    logs : dict
+        keys = user names, values = file paths of their flights lists,
+        see batch_users
+    airports_file : str
+        file path of airports csv data
+    outdir : str
+        directory the sites are written under
+    root : str
+        directory holding the static assets
+    processes : int
+        number of worker processes, defaults to the number of CPUs
+
+    Returns
+    -------
+    dict
+        keys = user names, values = None if the site was built, or the
+        traceback of the error which stopped it
+    """
+    from .geometry import warm_cache
+
+    airports = read_airports(airports_file)
+    cache_dir = warm_cache()
+
+    jobs = [(user, path, airports_file, os.path.join(outdir, user), root)
+            for user, path in sorted(logs.items())]
+
+    errors = {}
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(airports, cache_dir)) as pool:
+        for user, error, seconds in pool.imap_unordered(_build_user, jobs):
+            errors[user] = error
+            if error is None:
+                print('{:<20} built in {:.2f} s'.format(user, seconds))
+            else:
+                print('{:<20} FAILED after {:.2f} s\n{}'.format(user, seconds, error))
+
+    failed = sorted(user for user, error in errors.items() if error is not None)
+    print('Built {} of {} sites'.format(len(errors) - len(failed), len(errors)) +
+          (', failed: ' + ', '.join(failed) if failed else ''))
+    return errors
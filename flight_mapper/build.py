@@ -0,0 +1,408 @@
+import argparse
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+import shutil
+import time
+
+from .read_data import read_airports, read_flights
+from .html import make_html
+from .network import RouteNetwork
+from .pages import make_pages
+from .geojson import export_geojson
+from .tiles import render_tiles
+from .search import export_search_index
+from .images import save_figure, variant_names
+
+
+# Map views drawn by the build, with the keyword arguments given to plot_map
+map_views = {'earth': {},
+             'europe': {'europe': True},
+             'america': {'america': True}}
+
+# Static files copied to the top of the site
+assets = ['style.css', 'toggle.js', 'search.js']
+
+# Worker processes are started while other tasks run in threads, where
+# forking can deadlock, so they are spawned
+_spawn = multiprocessing.get_context('spawn')
+
+
+class Task:
+    def __init__(self, name, func, args=(), deps=(), inputs=(), outputs=(), process=False,
+                 slots=1):
+        """One step of the build.
+
+        Parameters
+        ----------
+        name : str
+            unique name of the task
+        func : callable
+            called as func(*dep_results, *args); must be a module level
+            function if the task runs in a process
+        args : tuple
+            extra arguments given to func after the results of the deps
+        deps : tuple
+            names of the tasks whose results func receives, in order
+        inputs : tuple
+            file paths read by the task
+        outputs : tuple
+            file paths written by the task
+        process : bool
+            run in a worker process rather than a thread, for tasks which
+            are CPU bound
+        slots : int
+            number of the run's jobs the task takes up, for a task which
+            runs a pool of worker processes of its own
+        """
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.process = process
+        self.slots = slots
+
+
+class TaskGraph:
+    def __init__(self, tasks=()):
+        """A set of Tasks which run concurrently as their deps allow."""
+        self.tasks = {}
+        self.timings = {}
+        self.failed = {}
+        self.skipped = []
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        if task.name in self.tasks:
+            raise ValueError(f'Duplicate task {task.name}')
+        self.tasks[task.name] = task
+        return task
+
+    def order(self, targets=None):
+        """Names of the tasks needed for targets, deps before dependents.
+
+        Parameters
+        ----------
+        targets : list
+            names of the tasks wanted, defaults to all tasks
+
+        Returns
+        -------
+        list
+            task names in a valid run order
+        """
+        if targets is None:
+            targets = list(self.tasks)
+
+        order = []
+        state = {}
+
+        def visit(name, chain):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError('Dependency cycle: ' + ' -> '.join(chain + [name]))
+            if name not in self.tasks:
+                raise KeyError(f'Unknown task {name}')
+            state[name] = 'visiting'
+            for dep in self.tasks[name].deps:
+                visit(dep, chain + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in targets:
+            visit(name, [])
+        return order
+
+    def run(self, jobs=None, targets=None, results=None, processes=True):
+        """Run the tasks, each as soon as all of its deps have finished.
+
+        A task which fails does not stop the others: the tasks which depend
+        on it are skipped, the rest are run, and then the first error is
+        raised. The failed and skipped tasks are left in self.failed and
+        self.skipped.
+
+        Parameters
+        ----------
+        jobs : int
+            maximum number of tasks running at once, counting a task as its
+            slots, defaults to the number of CPUs
+        targets : list
+            names of the tasks wanted, defaults to all tasks
+        results : dict
+            results already known, keyed by task name; these tasks are not
+            run again
+        processes : bool
+            run tasks marked process in worker processes; if False every
+            task runs in a thread, eg when already inside a worker process
+
+        Returns
+        -------
+        dict
+            keys = task names, values = task results
+        """
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        results = dict(results or {})
+        pending = [name for name in self.order(targets) if name not in results]
+        self.timings = {}
+        self.failed = {}
+        self.skipped = []
+
+        for name in pending:
+            for path in self.tasks[name].outputs:
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(jobs) as threads, \
+                (concurrent.futures.ProcessPoolExecutor(jobs, mp_context=_spawn) if processes
+                 else contextlib.nullcontext(threads)) as workers:
+            while pending or running:
+                for name in list(pending):
+                    task = self.tasks[name]
+                    if any(dep in self.failed or dep in self.skipped for dep in task.deps):
+                        pending.remove(name)
+                        self.skipped.append(name)
+                        continue
+                    if not all(dep in results for dep in task.deps):
+                        continue
+                    # A task with more slots than jobs runs on its own; a
+                    # task which does not fit yet leaves the free slots to
+                    # smaller ones behind it
+                    used = sum(self.tasks[n].slots for n in running.values())
+                    if running and used + min(task.slots, jobs) > jobs:
+                        continue
+                    pending.remove(name)
+                    executor = workers if task.process else threads
+                    dep_results = [results[dep] for dep in task.deps]
+                    future = executor.submit(task.func, *dep_results, *task.args)
+                    running[future] = name
+                    self.timings[name] = [time.perf_counter(), None]
+                if not running:
+                    continue
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    self.timings[name][1] = time.perf_counter()
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        self.failed[name] = e
+
+        if self.failed:
+            raise next(iter(self.failed.values()))
+        return results
+
+    def critical_path(self):
+        """The chain of tasks from the last run which set its duration.
+
+        Returns
+        -------
+        list
+            list of (task name, seconds), first task first
+        """
+        durations = {name: end - start for name, (start, end) in self.timings.items()}
+        longest = {}
+        previous = {}
+        for name in self.order(list(durations)):
+            deps = [dep for dep in self.tasks[name].deps if dep in durations]
+            before = max(deps, key=lambda dep: longest[dep], default=None)
+            previous[name] = before
+            longest[name] = durations[name] + (longest[before] if before is not None else 0.0)
+
+        if not longest:
+            return []
+        name = max(longest, key=longest.get)
+        path = []
+        while name is not None:
+            path.append((name, durations[name]))
+            name = previous[name]
+        return path[::-1]
+
+    def summary(self):
+        """Text report of the task timings and critical path of the last run."""
+        if not self.timings:
+            return 'No tasks run'
+        start = min(t[0] for t in self.timings.values())
+        end = max(t[1] for t in self.timings.values())
+
+        lines = ['{:<12} {:>8} {:>8}'.format('task', 'start', 'seconds')]
+        for name, (t0, t1) in sorted(self.timings.items(), key=lambda x: x[1][0]):
+            lines.append('{:<12} {:>8.2f} {:>8.2f}'.format(name, t0 - start, t1 - t0) +
+                         ('  FAILED' if name in self.failed else ''))
+        if self.skipped:
+            lines.append('skipped: ' + ', '.join(self.skipped))
+
+        path = self.critical_path()
+        lines.append('')
+        lines.append('critical path: {} ({:.2f} s of {:.2f} s wall time)'.format(
+            ' -> '.join(name for name, _ in path), sum(d for _, d in path), end - start))
+        return '\n'.join(lines)
+
+
+def _read_flights(airports, filename):
+    # read_flights takes the file name first
+    return read_flights(filename, airports)
+
+
+def write_html(flights, airports, network, path):
+    with open(path, mode='w') as f:
+        f.write(make_html(flights, airports, network))
+
+
+def warm_geometry(shapefile_dir=None):
+    from .geometry import warm_cache
+    return warm_cache(shapefile_dir=shapefile_dir)
+
+
+def write_pages(flights, airports, cache_dir, outdir, processes):
+    return make_pages(flights, airports, outdir, processes=processes, cache_dir=cache_dir)
+
+
+def write_map(flights, airports, cache_dir, path, view):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from .plot import plot_map
+
+    fig = plot_map(flights, airports, cache_dir=cache_dir, **map_views[view])
+    paths = save_figure(fig, path, bbox_inches='tight')
+    plt.close(fig)
+    return paths
+
+
+def copy_files(paths, outdir):
+    for path in paths:
+        shutil.copy2(path, os.path.join(outdir, os.path.basename(path)))
+
+
+def copy_tree(path, outdir):
+    shutil.copytree(path, outdir, dirs_exist_ok=True)
+
+
+def site_graph(flights_file='flights.txt',
+               airports_file='data/airports.csv',
+               outdir='public',
+               root='.',
+               pictures=None,
+               processes=None,
+               shapefiles=None):
+    """The tasks which build the whole site.
+
+    Parameters
+    ----------
+    flights_file : str
+        file path of flights list
+    airports_file : str
+        file path of airports csv data
+    outdir : str
+        directory the site is written to
+    root : str
+        directory holding the static assets
+    pictures : str
+        directory of pictures copied to the site, defaults to root/pictures;
+        skipped if it does not exist
+    processes : int
+        number of worker processes used by each of the pages and tiles
+        tasks, defaults to the number of CPUs; each of them takes up as many
+        of the run's jobs
+    shapefiles : str
+        directory of Natural Earth shapefiles to build the basemap geometry
+        cache from, rather than downloading them; only read for geometry
+        missing from the cache
+
+    Returns
+    -------
+    TaskGraph
+    """
+    graph = TaskGraph()
+    out = lambda name: os.path.join(outdir, name)
+    pool_slots = processes or os.cpu_count() or 1
+
+    graph.add(Task('airports', read_airports, args=(airports_file,), inputs=(airports_file,)))
+    graph.add(Task('flights', _read_flights, args=(flights_file,), deps=('airports',),
+                   inputs=(flights_file,)))
+
+    graph.add(Task('network', RouteNetwork, deps=('flights',)))
+    graph.add(Task('html', write_html, args=(out('index.html'),),
+                   deps=('flights', 'airports', 'network'),
+                   outputs=(out('index.html'),), process=True))
+
+    # The Natural Earth geometry is read and projected once, before the maps
+    # are drawn, rather than by each map at the same time
+    graph.add(Task('geometry', warm_geometry, args=(shapefiles,), process=True))
+    for view in map_views:
+        path = out(view + '.png')
+        graph.add(Task('map_' + view, write_map, args=(path, view),
+                       deps=('flights', 'airports', 'geometry'),
+                       outputs=tuple(variant_names(path)), process=True))
+
+    graph.add(Task('pages', write_pages, args=(outdir, processes),
+                   deps=('flights', 'airports', 'geometry'),
+                   outputs=(out('pages.json'),), slots=pool_slots))
+    graph.add(Task('geojson', export_geojson, args=(out('geo'),), deps=('flights',),
+                   outputs=(out('geo/index.json'),), process=True))
+    graph.add(Task('search', export_search_index, args=(out('search'),), deps=('flights',),
+                   outputs=(out('search/meta.json'),), process=True))
+    graph.add(Task('tiles', render_tiles, args=(out('tiles'), range(8), processes), deps=('flights',),
+                   outputs=(out('tiles/tiles.json'),), slots=pool_slots))
+
+    asset_paths = tuple(os.path.join(root, name) for name in assets)
+    graph.add(Task('assets', copy_files, args=(asset_paths, outdir), inputs=asset_paths,
+                   outputs=tuple(out(name) for name in assets)))
+    if pictures is None:
+        pictures = os.path.join(root, 'pictures')
+    if os.path.isdir(pictures):
+        graph.add(Task('pictures', copy_tree, args=(pictures, outdir), inputs=(pictures,),
+                       outputs=tuple(out(name) for name in sorted(os.listdir(pictures)))))
+
+    return graph
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the flights site.')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='number of tasks and worker processes to run at once '
+                             '(default: number of CPUs)')
+    parser.add_argument('--out', default='public', help='output directory')
+    parser.add_argument('--flights', default='flights.txt', help='flights list')
+    parser.add_argument('--airports', default='data/airports.csv', help='airports csv data')
+    parser.add_argument('--watch', action='store_true',
+                        help='serve the site and rebuild it whenever an input changes')
+    parser.add_argument('--port', type=int, default=8000, help='port of the --watch preview server')
+    parser.add_argument('--shapefiles', metavar='DIR',
+                        help='build the map geometry cache from the Natural Earth shapefiles '
+                             'in DIR, eg ne_50m_land.shp, rather than downloading them')
+    parser.add_argument('--batch', nargs='+', metavar='FLIGHTS',
+                        help='build a site for each of these flights lists, '
+                             'in OUT/<user>/ (see flight_mapper.batch.batch_users)')
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        from .batch import batch_build, batch_users
+        errors = batch_build(batch_users(args.batch), args.airports, args.out,
+                             processes=args.jobs)
+        if any(error is not None for error in errors.values()):
+            raise SystemExit(1)
+        return
+
+    if args.watch:
+        from .watch import watch
+        watch(args.flights, args.airports, args.out, jobs=args.jobs, port=args.port)
+        return
+
+    graph = site_graph(args.flights, args.airports, args.out, processes=args.jobs,
+                       shapefiles=args.shapefiles)
+    try:
+        graph.run(jobs=args.jobs)
+    except Exception:
+        print(graph.summary())
+        raise SystemExit('\n'.join(f'{name} failed: {error}'
+                                    for name, error in graph.failed.items()))
+    print(graph.summary())
@@ -0,0 +1,244 @@
+import collections
+import json
+import os
+import numpy as np
+
+from .read_data import gc_distance
+
+
+# Levels of detail, from the most zoomed out to the most zoomed in.
+# tolerance : maximum deviation in degrees allowed when simplifying a route
+# decimals : number of decimal places kept in the coordinates
+# max_routes : only the most flown routes are kept, None for all of them
+lod_levels = [dict(zoom=0, tolerance=1.0, decimals=1, max_routes=2000),
+              dict(zoom=3, tolerance=0.25, decimals=2, max_routes=10000),
+              dict(zoom=6, tolerance=0.02, decimals=3, max_routes=None)]
+
+
+def great_circle_points(airport1, airport2, step=1.0):
+    """Points along the great circle between two airports.
+
+    Parameters
+    ----------
+    airport1 : Airport
+    airport2 : Airport
+    step : float
+        approximate spacing of the points in degrees of arc
+
+    Returns
+    -------
+    np.ndarray
+        array of shape (n, 2) of (lon, lat) in degrees, with the longitudes
+        in [-180, 180]
+    """
+    lat1, lon1, lat2, lon2 = np.radians([airport1.lat, airport1.lon, airport2.lat, airport2.lon])
+    p1 = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    p2 = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+
+    omega = np.arccos(np.clip(np.dot(p1, p2), -1.0, 1.0))
+    n = max(2, int(np.ceil(np.degrees(omega) / step)) + 1)
+    t = np.linspace(0.0, 1.0, n)[:, None]
+
+    if omega < 1e-9:
+        xyz = p1 + t * (p2 - p1)
+    else:
+        xyz = (np.sin((1 - t) * omega) * p1 + np.sin(t * omega) * p2) / np.sin(omega)
+
+    lons = np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+    lats = np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+    return np.column_stack((lons, lats))
+
+
+def split_antimeridian(points):
+    """Split a line wherever it crosses the 180th meridian.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        array of shape (n, 2) of (lon, lat) in degrees
+
+    Returns
+    -------
+    list
+        list of arrays of (lon, lat), none of which cross the antimeridian
+    """
+    jumps = np.nonzero(np.abs(np.diff(points[:, 0])) > 180)[0]
+    if len(jumps) == 0:
+        return [points]
+
+    parts = []
+    start = 0
+    for i in jumps:
+        (lon1, lat1), (lon2, lat2) = points[i], points[i + 1]
+        edge = 180.0 if lon1 > 0 else -180.0
+        lon2_unwrapped = lon2 + 360.0 if lon1 > 0 else lon2 - 360.0
+        lat = lat1 + (lat2 - lat1) * (edge - lon1) / (lon2_unwrapped - lon1)
+        parts.append(np.vstack((points[start:i + 1], [[edge, lat]])))
+        points = points.copy()
+        points[i] = (-edge, lat)
+        start = i
+    parts.append(points[start:])
+    return parts
+
+
+def simplify(points, tolerance):
+    """Simplify a line with the Ramer-Douglas-Peucker algorithm.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        array of shape (n, 2)
+    tolerance : float
+        maximum distance of a removed point from the simplified line
+
+    Returns
+    -------
+    np.ndarray
+        the retained points, always including both ends
+    """
+    if len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        d = end - start
+        norm = np.hypot(*d)
+        if norm == 0:
+            dists = np.hypot(*(inner - start).T)
+        else:
+            dists = np.abs(d[0] * (inner[:, 1] - start[1]) - d[1] * (inner[:, 0] - start[0])) / norm
+        i = np.argmax(dists)
+        if dists[i] > tolerance:
+            i += first + 1
+            keep[i] = True
+            stack.append((first, i))
+            stack.append((i, last))
+
+    return points[keep]
+
+
+def collapse_legs(flights):
+    """Count how many times each route was flown, in either direction.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+
+    Returns
+    -------
+    list
+        list of ((Airport, Airport), count), most flown first
+    """
+    airports = {}
+    counts = collections.Counter()
+    for flight in flights:
+        for leg in flight.route:
+            if leg[0] is leg[1]:
+                continue
+            key = tuple(sorted((leg[0].code, leg[1].code)))
+            airports[key] = leg if leg[0].code == key[0] else (leg[1], leg[0])
+            counts[key] += 1
+
+    return [(airports[key], count) for key, count in
+            sorted(counts.items(), key=lambda x: (-x[1], x[0]))]
+
+
+def route_features(routes, tolerance, decimals):
+    """GeoJSON features for routes at one level of detail."""
+    features = []
+    for (airport1, airport2), count in routes:
+        points = great_circle_points(airport1, airport2)
+        lines = []
+        for part in split_antimeridian(points):
+            part = np.round(simplify(part, tolerance), decimals)
+            lines.append(part.tolist())
+
+        if len(lines) == 1:
+            geometry = {'type': 'LineString', 'coordinates': lines[0]}
+        else:
+            geometry = {'type': 'MultiLineString', 'coordinates': lines}
+
+        features.append({'type': 'Feature',
+                         'geometry': geometry,
+                         'properties': {'from': airport1.code,
+                                        'to': airport2.code,
+                                        'count': count,
+                                        'dist': round(gc_distance(airport1, airport2))}})
+    return features
+
+
+def airport_features(flights):
+    """GeoJSON point features for all airports visited."""
+    counts = collections.Counter()
+    for flight in flights:
+        for leg in flight.route:
+            counts[leg[0]] += 1
+            counts[leg[1]] += 1
+
+    features = []
+    for airport, count in sorted(counts.items(), key=lambda x: (-x[1], x[0].code)):
+        features.append({'type': 'Feature',
+                         'geometry': {'type': 'Point',
+                                      'coordinates': [round(airport.lon, 4), round(airport.lat, 4)]},
+                         'properties': {'code': airport.code,
+                                        'iata': airport.iata,
+                                        'name': str(airport),
+                                        'count': count}})
+    return features
+
+
+def _write_json(path, data):
+    with open(path, mode='w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def export_geojson(flights, outdir, levels=None):
+    """Write the routes and airports as GeoJSON for client-side maps.
+
+    Legs flown more than once are collapsed into a single route weighted by
+    its count. Each level of detail is written to its own file, with the
+    great circles simplified and the coordinates rounded to suit that zoom.
+    An index.json lists the files and the zoom level each starts at.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    outdir : str
+        directory to write the files to
+    levels : list
+        levels of detail, defaults to lod_levels
+
+    Returns
+    -------
+    dict
+        the contents of index.json
+    """
+    if levels is None:
+        levels = lod_levels
+    os.makedirs(outdir, exist_ok=True)
+
+    routes = collapse_legs(flights)
+
+    index = {'airports': 'airports.geojson', 'routes': []}
+    _write_json(os.path.join(outdir, 'airports.geojson'),
+                {'type': 'FeatureCollection', 'features': airport_features(flights)})
+
+    for level in levels:
+        filename = 'routes-z{}.geojson'.format(level['zoom'])
+        selected = routes if level['max_routes'] is None else routes[:level['max_routes']]
+        features = route_features(selected, level['tolerance'], level['decimals'])
+        _write_json(os.path.join(outdir, filename),
+                    {'type': 'FeatureCollection', 'features': features})
+        index['routes'].append({'minzoom': level['zoom'], 'file': filename})
+
+    _write_json(os.path.join(outdir, 'index.json'), index)
+    return index
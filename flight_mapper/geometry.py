@@ -0,0 +1,229 @@
+import hashlib
+import os
+import shapely
+import cartopy.crs as ccrs
+
+
+# Map views, keyed by name:
+# latitudes : (min, max) latitude of the Mercator projection
+# extent : (west, east, south, north) in degrees, None for the whole world
+# figsize : width and height of the figure in inches
+# labels : whether to label the airports
+# states : whether to draw the borders of states and provinces
+# scale : Natural Earth scale of the features, the one cartopy's adaptive
+#         scaler chooses for the extent
+views = {'earth': dict(latitudes=(-65, 80), extent=None, figsize=15,
+                       labels=False, states=False, scale='110m'),
+         'europe': dict(latitudes=(35.5, 71.5), extent=(-24, 30, 35.5, 71.5), figsize=10.5,
+                        labels=True, states=False, scale='50m'),
+         'america': dict(latitudes=(-65, 62), extent=(-160, -58, 16.5, 62), figsize=14,
+                         labels=True, states=True, scale='50m')}
+
+# Natural Earth features drawn on the maps, in drawing order, with the
+# keyword arguments given to add_geometries. A feature with a scale of its
+# own is always read at that scale rather than the view's.
+features = {'land': dict(category='physical', name='land', style=dict(color='moccasin')),
+            'ocean': dict(category='physical', name='ocean',
+                          style=dict(color='cornflowerblue', alpha=0.6)),
+            'lakes': dict(category='physical', name='lakes',
+                          style=dict(color='cornflowerblue', alpha=0.6)),
+            'coastline': dict(category='physical', name='coastline',
+                              style=dict(facecolor='none', edgecolor='k', linewidth=0.3)),
+            'borders': dict(category='cultural', name='admin_0_boundary_lines_land',
+                            style=dict(facecolor='none', edgecolor='k', linewidth=0.3)),
+            'states': dict(category='cultural', name='admin_1_states_provinces_lines',
+                           scale='110m',
+                           style=dict(facecolor='none', edgecolor='k', linewidth=0.3))}
+
+# Degrees kept around a view's extent, so that nothing is cut short at the
+# edges of the map
+margin = 5.0
+
+# Directory of the cached geometry, relative to the top of the repository
+# like the other data
+default_cache_dir = os.path.join('data', 'geometry')
+
+# Geometry already loaded by this process, keyed by cache file path, so
+# that a long-lived process drawing many maps reads each file once
+_loaded = {}
+
+
+def view_projection(view):
+    """The Mercator projection of a map view."""
+    min_lat, max_lat = views[view]['latitudes']
+    projection = ccrs.Mercator(max_latitude=max_lat, min_latitude=min_lat)
+    projection._threshold = projection._threshold / 100.0
+    return projection
+
+
+def view_features(view):
+    """Names of the features drawn on a map view, in drawing order."""
+    return [name for name in features if name != 'states' or views[view]['states']]
+
+
+def feature_scale(view, feature):
+    """Natural Earth scale a feature is read at in a view."""
+    return features[feature].get('scale', views[view]['scale'])
+
+
+def _clip_box(view):
+    extent = views[view]['extent']
+    if extent is None:
+        min_lat, max_lat = views[view]['latitudes']
+        return (-180.0, max(min_lat - margin, -90.0), 180.0, min(max_lat + margin, 90.0))
+    west, east, south, north = extent
+    return (max(west - margin, -180.0), max(south - margin, -90.0),
+            min(east + margin, 180.0), min(north + margin, 90.0))
+
+
+def cache_path(view, feature, cache_dir=None):
+    """File path of the cached geometry of one feature in one view.
+
+    The name includes a fingerprint of the projection, extent, source and
+    scale of the geometry, so that changing any of them never reads a stale file.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    source = features[feature]
+    key = repr((view_projection(view).proj4_init, _clip_box(view),
+                source['category'], source['name'], feature_scale(view, feature)))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(cache_dir, f'{view}-{feature}-{digest}.wkb')
+
+
+def build_geometry(view, feature, shapefile_dir=None):
+    """Read a feature from the Natural Earth shapefiles, clip it to a view
+    and project it into the view's projection.
+
+    Parameters
+    ----------
+    view : str
+        key of views
+    feature : str
+        key of features
+    shapefile_dir : str
+        directory holding the shapefiles as Natural Earth distributes them,
+        eg ne_50m_land.shp; if None, cartopy downloads the shapefiles if
+        they are not already in its data directory
+
+    Returns
+    -------
+    list
+        shapely geometries in the coordinates of view_projection(view)
+    """
+    import cartopy.io.shapereader as shapereader
+
+    source = features[feature]
+    scale = feature_scale(view, feature)
+    if shapefile_dir is None:
+        filename = shapereader.natural_earth(resolution=scale, category=source['category'],
+                                             name=source['name'])
+    else:
+        filename = os.path.join(shapefile_dir, f'ne_{scale}_{source["name"]}.shp')
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f'No Natural Earth shapefile {filename}')
+    projection = view_projection(view)
+    box = _clip_box(view)
+    plate_carree = ccrs.PlateCarree()
+
+    geometries = []
+    for geometry in shapereader.Reader(filename).geometries():
+        geometry = shapely.clip_by_rect(geometry, *box)
+        if geometry.is_empty:
+            continue
+        geometry = projection.project_geometry(geometry, plate_carree)
+        if not geometry.is_empty:
+            geometries.append(geometry)
+    return geometries
+
+
+def load_geometry(view, feature, cache_dir=None, shapefile_dir=None):
+    """The geometry of one feature in one view, from the cache.
+
+    A missing cache file is built with build_geometry and written, so the
+    shapefiles are only read the first time. RuntimeError is raised if the
+    shapefiles can be neither found nor downloaded.
+
+    Parameters
+    ----------
+    view : str
+        key of views
+    feature : str
+        key of features
+    cache_dir : str
+        directory of the cache, defaults to default_cache_dir
+    shapefile_dir : str
+        directory of local Natural Earth shapefiles, see build_geometry
+
+    Returns
+    -------
+    list
+        shapely geometries in the coordinates of view_projection(view)
+    """
+    path = cache_path(view, feature, cache_dir)
+    if path in _loaded:
+        return _loaded[path]
+    try:
+        with open(path, 'rb') as f:
+            _loaded[path] = list(shapely.from_wkb(f.read()).geoms)
+        return _loaded[path]
+    except FileNotFoundError:
+        pass
+
+    try:
+        geometries = build_geometry(view, feature, shapefile_dir)
+    except OSError as e:
+        # Downloads fail with URLError, which is an OSError
+        source = features[feature]
+        raise RuntimeError(
+            f'The {view} map needs the Natural Earth {feature_scale(view, feature)} '
+            f'{source["category"]} {source["name"]} shapefile, which is not in the '
+            f'geometry cache {os.path.dirname(path)} and could not be read ({e}). '
+            f'Build once with network access, or download the shapefiles from '
+            f'naturalearthdata.com and build with --shapefiles DIR.') from e
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Several processes may build the same file at once, so each writes its
+    # own temporary file and moves it into place in one step
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(shapely.to_wkb(shapely.GeometryCollection(geometries)))
+    os.replace(tmp_path, path)
+    _loaded[path] = geometries
+    return geometries
+
+
+def warm_cache(cache_dir=None, view_names=None, shapefile_dir=None):
+    """Build the cached geometry of every feature of every view, and remove
+    cache files which no longer match any view.
+
+    Parameters
+    ----------
+    cache_dir : str
+        directory of the cache, defaults to default_cache_dir
+    view_names : list
+        views to build, defaults to all of them
+    shapefile_dir : str
+        directory of local Natural Earth shapefiles, see build_geometry
+
+    Returns
+    -------
+    str
+        the cache directory
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir
+    if view_names is None:
+        view_names = list(views)
+
+    current = set()
+    for view in view_names:
+        for feature in view_features(view):
+            load_geometry(view, feature, cache_dir, shapefile_dir)
+            current.add(os.path.basename(cache_path(view, feature, cache_dir)))
+
+    for name in os.listdir(cache_dir):
+        view = name.split('-')[0]
+        if name.endswith('.wkb') and view in view_names and name not in current:
+            os.remove(os.path.join(cache_dir, name))
+
+    return cache_dir
@@ -1,7 +1,10 @@
 import collections
-import datetime
-import numpy as np
-from yattag import Doc, indent
+import re
+from yattag import Doc
+
+from .read_data import gc_distance
+from .network import RouteNetwork
+from .images import map_sizes, variant_name
 
 engine_manufacts_abbr = \
     dict(PW='Pratt & Whitney', GE='General Electric', RR='Rolls Royce', CFMI='CFM International',
@@ -48,6 +51,12 @@ city_names = {'LON':'London',
               'REK': 'Reykjavík',
               'YTO': 'Toronto'}
 
+# Kinds of entity pages, with the directory they are written to
+page_kinds = {'airport': 'airports',
+              'airline': 'airlines',
+              'type': 'types',
+              'registration': 'registrations'}
+
 cities_inv = dict(cities)
 cities = dict((v, k) for k in cities_inv for v in cities_inv[k])
 
@@ -65,6 +74,34 @@ def write_city(city, airports_tally):
     return text
 
 
+def slugify(key):
+    """Turn an entity name into a file name, eg 'Aer Lingus' -> 'Aer-Lingus'."""
+    return re.sub(r'[^A-Za-z0-9]+', '-', key).strip('-') or '-'
+
+
+def page_href(kind, name, root=''):
+    """URL of the page written by make_pages for one entity.
+
+    Parameters
+    ----------
+    kind : str
+        key of page_kinds
+    name : str
+        airport code, airline, airplane type or registration
+    root : str
+        relative path from the linking page to the top of the site
+    """
+    return f'{root}{page_kinds[kind]}/{slugify(name)}.html'
+
+
+def picture_href(pic, root=''):
+    """URL of a picture, which is copied to the top of the site unless it is
+    given as an absolute URL or path."""
+    if '://' in pic or pic.startswith('/'):
+        return pic
+    return root + pic
+
+
 def write_segment(segment, direction='one-way'):
     """Generate the HTML representation of a segment.
 
@@ -82,33 +119,15 @@ def write_segment(segment, direction='one-way'):
     return s
 
 
-def gc_distance(airport1, airport2):
-    """Calculate the distance in statute miles between two airports.
-
-    Parameters
-    ----------
-    airport1 : Airport
-    airport2 : Airport
-
-    Returns
-    -------
-    float
-        the distance in statute miles between the two airports
-    """
-    p1 = airport1.lat * 2.0 * np.pi/360
-    p2 = airport2.lat * 2.0 * np.pi/360
-    l1 = airport1.lon * 2.0 * np.pi/360
-    l2 = airport2.lon * 2.0 * np.pi/360
-    r = 3963.19
-    gcd = 2 * r * np.arcsin(np.sqrt(np.sin((p2-p1)/2)**2 + np.cos(p1) * np.cos(p2) * np.sin((l2-l1)/2)**2))
-    return gcd
-
-
 class HtmlTable:
-    def __init__(self, title, row_names, counts, html=False, html_count=False):
+    def __init__(self, title, row_names, counts, html=False, html_count=False, links=None):
+        """
+        links : list of URLs the row names link to, None for no link
+        """
         self.title = title
         self.row_names = row_names
         self.counts = counts
+        self.links = links if links is not None else [None] * len(row_names)
 
         self.html = html
         self.html_count = html_count
@@ -120,20 +139,24 @@ class HtmlTable:
             with tag('tr'):
                 with tag('th', colspan=2):
                     text(self.title)
-            for row, count in zip(self.row_names, self.counts):
+            for row, count, link in zip(self.row_names, self.counts, self.links):
                 with tag('tr'):
                     with tag('td'):
+                        if link is not None:
+                            doc.asis(f'<a href="{link}">')
                         if not self.html:
                             text(row)
                         else:
                             doc.asis(row)
+                        if link is not None:
+                            doc.asis('</a>')
                     with tag('td'):
                         if not self.html_count:
                             text(count)
                         else:
                             doc.asis(count)
 
-        return indent(doc.getvalue())
+        return doc.getvalue()
 
 
 class TallyTable(HtmlTable):
@@ -153,9 +176,8 @@ class TallyTable(HtmlTable):
         total_distance = 0
         num_segments = 0
         for flight in flights:
-            for leg in flight.route:
-                total_distance += gc_distance(*leg)
-                num_segments += 1
+            total_distance += flight.distance
+            num_segments += len(flight.route)
 
         mean_segment_distance = total_distance / num_segments
 
@@ -225,14 +247,47 @@ class SuperTable:
                     with tag('td'):
                         doc.asis(value2)
 
-        return indent(doc.getvalue())
+        return doc.getvalue()
+
+
+
+class NetworkTable(SuperTable):
+    def __init__(self, network):
+        components = network.components()
+        hub = network.hubs(n=len(network.airports))
+        central = max(hub, key=lambda x: x[2])
+        chain = network.diameter()
 
+        self.title = 'Network'
+        self.rows = ['Airports', 'Routes', 'Connected groups', 'Most central airport', 'Longest chain']
+        self.values1 = ['', '', '', central[0].write_airport(),
+                        ' &rarr; '.join(airport.write_airport() for airport in chain)]
+        self.values2 = [str(len(network.airports)),
+                        str(network.distances.nnz // 2),
+                        '{} (largest {})'.format(len(components), len(components[0]) if components else 0),
+                        '{:.02f}'.format(central[2]),
+                        '{} legs'.format(len(chain) - 1)]
+
+
+class HtmlTableRoutes(HtmlTable):
+    def __init__(self, network, n=25):
+        routes = network.top_routes(n)
+        super().__init__('Routes', [write_segment(x[0], direction='return') for x in routes],
+                         [x[1] for x in routes], html=True)
+
+
+class HtmlTableHubs(HtmlTable):
+    def __init__(self, network, n=25):
+        hubs = network.hubs(n)
+        super().__init__('Hubs', [x[0].write_airport() for x in hubs],
+                         [x[1] for x in hubs], html=True)
 
 
 class HtmlTableLocations(HtmlTable):
-    def __init__(self, flights, airports, attr=None, restrict=None, title=None):
+    def __init__(self, flights, airports, attr=None, restrict=None, title=None, links=False):
         """
         restrict : (attr(str), value(str))
+        links : link airports to their pages, when attr is None
         """
         all_airports = []
         for flight in flights:
@@ -256,7 +311,8 @@ class HtmlTableLocations(HtmlTable):
         if title is None:
             title = 'Locations'
         if attr is None:
-            super().__init__(title, [x[0].write_airport() for x in counts], [x[1] for x in counts], html=True)
+            super().__init__(title, [x[0].write_airport() for x in counts], [x[1] for x in counts], html=True,
+                             links=[page_href('airport', x[0].code) for x in counts] if links else None)
         else:
             super().__init__(title, [x[0] for x in counts], [x[1] for x in counts], html=True)
 
@@ -296,7 +352,10 @@ class HtmlTableCities(HtmlTable):
 
 
 class HtmlTableAirplanes(HtmlTable):
-    def __init__(self, flights, attrs, title=None):
+    def __init__(self, flights, attrs, title=None, kind=None):
+        """
+        kind : key of page_kinds to link rows to, named by the last of attrs
+        """
         list_of_attrs = [' '.join(getattr(flight, attr) for attr in attrs) for flight in flights]
         counts = collections.Counter(list_of_attrs)
         counts = sorted(counts.most_common(), key=lambda x: (-x[1], x[0]))
@@ -304,11 +363,19 @@ class HtmlTableAirplanes(HtmlTable):
         if title is None:
             title = attrs[0]
 
-        super().__init__(title, [x[0] for x in counts], [x[1] for x in counts])
+        links = None
+        if kind is not None:
+            names = {row: getattr(flight, attrs[-1]) for row, flight in zip(list_of_attrs, flights)}
+            links = [page_href(kind, names[x[0]]) for x in counts]
+
+        super().__init__(title, [x[0] for x in counts], [x[1] for x in counts], links=links)
 
 
 class HtmlTableDropdown(HtmlTable):
-    def __init__(self, flights, attr1, attr2, title=None):
+    def __init__(self, flights, attr1, attr2, title=None, kind=None):
+        """
+        kind : key of page_kinds to link the values of attr1 to
+        """
         if title is None:
             title = attr1
 
@@ -335,7 +402,8 @@ class HtmlTableDropdown(HtmlTable):
                 print(row_subtables)
 
         self.row_subtables = row_subtables
-        super().__init__(title, row_names, counts)
+        links = [page_href(kind, row) for row in row_names] if kind is not None else None
+        super().__init__(title, row_names, counts, links=links)
 
     def __str__(self):
         doc, tag, text = Doc().tagtext()
@@ -344,46 +412,59 @@ class HtmlTableDropdown(HtmlTable):
             with tag('tr'):
                 with tag('th', colspan=2):
                     text(self.title)
-            for row, count, subtable in zip(self.row_names, self.counts, self.row_subtables):
+            for row, count, subtable, link in zip(self.row_names, self.counts, self.row_subtables,
+                                                  self.links):
                 if subtable is None:
                     with tag('tr'):
                         with tag('td'):
-                            text(row)
+                            if link is not None:
+                                with tag('a', href=link):
+                                    text(row)
+                            else:
+                                text(row)
                         with tag('td'):
                             text(count)
 
                 else:
                     subrows = subtable[0]
                     subcounts = subtable[1]
-                    expand_script = '''$(this).nextAll(':lt(''' + \
-                                    str(len(subrows)) + \
-                                    ''')').toggle()'''
-                    with tag('tr', onClick=expand_script):
+                    with tag('tr', ('data-expand', len(subrows)), klass='expand'):
                         with tag('td'):
-                            doc.asis(row + ' &#9654;')
+                            if link is not None:
+                                with tag('a', href=link):
+                                    text(row)
+                            else:
+                                doc.asis(row)
+                            doc.asis(' &#9654;')
                         with tag('td'):
                             text(count)
                     for subrow, subcount in zip(subrows, subcounts):
-                        with tag('tr', style='display:none;'):
+                        with tag('tr', klass='subrow row_closed'):
+                            with tag('td'):
+                                doc.asis('&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;')
+                                text(subrow)
                             with tag('td'):
-                                with tag('span', style='color:gray;font-style:italic;'):
-                                    doc.asis('&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;')
-                                    text(subrow)
-                            with tag('td', style='text-align:right;'):
-                                with tag('span', style='color:gray;font-style:italic;'):
-                                    text(subcount)
+                                text(subcount)
 
-        return indent(doc.getvalue())
+        return doc.getvalue()
 
 class LogTable:
-    def __init__(self, flights, airports):
+    def __init__(self, flights, airports, root='', links=True):
+        """
+        root : relative path from the page to the top of the site, eg '../'
+        links : link airports, airlines, types and registrations to their pages
+        """
         self.flights = flights
         self.airports = airports
+        self.root = root
+        self.links = links
 
     def __str__(self):
         doc, tag, text = Doc().tagtext()
 
         cols = ['Date', 'Number', 'Route', 'Airline', 'Airplane', 'Photographs', '...']
+        root = self.root
+        link = (lambda airport: page_href('airport', airport.code, root)) if self.links else None
 
 
         with tag('table', klass='log-table'):
@@ -401,148 +482,209 @@ class LogTable:
                         text((flight.desig or '') + (flight.number or ''))
 
                     with tag('td'):
-                        doc.asis(flight.route_str)
+                        if link is None:
+                            doc.asis(flight.route_str)
+                        else:
+                            doc.asis(flight.write_route(link))
 
                     with tag('td'):
-                        if flight.adm_cxr != flight.mkt_cxr and flight.adm_cxr != None and flight.adm_cxr != '':
-                            doc.text(f'{flight.mkt_cxr} (operated by {flight.adm_cxr})')
+                        if self.links:
+                            with tag('a', href=page_href('airline', flight.mkt_cxr, root)):
+                                doc.text(flight.mkt_cxr)
                         else:
                             doc.text(flight.mkt_cxr)
+                        if flight.adm_cxr != flight.mkt_cxr and flight.adm_cxr != None and flight.adm_cxr != '':
+                            doc.text(f' (operated by {flight.adm_cxr})')
 
                     with tag('td'):
-                        doc.text(f'{flight.manufacturer} {flight.type3} ({flight.registration})')
+                        if self.links and flight.type2:
+                            with tag('a', href=page_href('type', flight.type2, root)):
+                                doc.text(f'{flight.manufacturer} {flight.type3}')
+                        else:
+                            doc.text(f'{flight.manufacturer} {flight.type3}')
+                        doc.text(' (')
+                        if self.links and flight.registration:
+                            with tag('a', href=page_href('registration', flight.registration, root)):
+                                doc.text(flight.registration)
+                        else:
+                            doc.text(f'{flight.registration}')
+                        doc.text(')')
 
                     with tag('td'):
                         if flight.pics is not None:
                             for pic in flight.pics:
-                                with tag('a', target='_blank', href=pic):
-                                    doc.stag('img', src=pic, klass='log')
+                                with tag('a', target='_blank', href=picture_href(pic, root)):
+                                    doc.stag('img', src=picture_href(pic, root), klass='log')
                         else:
                             doc.text('')
 
 
                     with tag('td'):
-                        with tag('a', klass='expand', onclick=f'toggle2("f{i}","f{i}ud");clean(document.body)'):
-                            with tag('span', id=f'f{i}ud', klass='downarrowk'):
+                        with tag('a', ('data-row', f'f{i}'), klass='expand'):
+                            with tag('span', klass='downarrowk'):
                                 text()
 
-                    with tag('tr', klass='row_closed', id=f'f{i}'):
-                        with tag('td', colspan=7, style='text-align:right;'):
-
-                            if flight.pics is not None:
-                                with tag('div', style='display:inline-block;'):
-                                    for pic in flight.pics:
-                                        with tag('a', href=pic, target='_blank'):
-                                            doc.stag('img', src=pic, klass='zoom')
+                with tag('tr', klass='details row_closed', id=f'f{i}'):
+                    with tag('td', colspan=7):
 
-                            with tag('div', style='display:inline-block;vertical-align:top;'):
-                                with tag('table', klass='bare'):
-                                    dist = 0
-                                    for leg in flight.route:
-                                        dist += gc_distance(*leg)
-                                    with tag('tr'):
-                                        with tag('td'):
-                                            text('gc distance')
-                                        with tag('td'):
-                                            text('{} mi'.format(round(dist)))
-
-                                    if flight.cabin is not None:
-                                        if flight.seat is not None:
-                                            with tag('tr'):
-                                                with tag('td'):
-                                                    text('seat')
-                                                with tag('td'):
-                                                    text(flight.seat + ' (' + flight.seat_type + ', ' +
-                                                         flight.cabin + ')')
-
-                                    for attr in ['msn', 'ln']:
-                                        if getattr(flight, attr) is not None:
-                                            with tag('tr'):
-                                                with tag('td'):
-                                                    text(attr)
-                                                with tag('td'):
-                                                    text(getattr(flight, attr))
-
-                                    if flight.sta is not None:
+                        if flight.pics is not None:
+                            with tag('div'):
+                                for pic in flight.pics:
+                                    with tag('a', href=picture_href(pic, root), target='_blank'):
+                                        doc.stag('img', src=picture_href(pic, root), klass='zoom')
+
+                        with tag('div'):
+                            with tag('table', klass='bare'):
+                                with tag('tr'):
+                                    with tag('td'):
+                                        text('gc distance')
+                                    with tag('td'):
+                                        text('{} mi'.format(round(flight.distance)))
+
+                                if flight.cabin is not None:
+                                    if flight.seat is not None:
                                         with tag('tr'):
                                             with tag('td'):
-                                                text('std/sta')
+                                                text('seat')
                                             with tag('td'):
-                                                text('{}/{}'.format(flight.std, flight.sta))
-
-                                    if flight.first_flight is not None:
-                                        d = flight.first_flight
-                                        if len(d) == 8:
-                                            date_first_flight = datetime.datetime(int(d[:4]), int(d[4:6]), int(d[6:]))
-                                            ff_str = date_first_flight.strftime("%Y %b %d")
-                                        elif len(d) == 6:
-                                            date_first_flight = datetime.datetime(int(d[:4]), int(d[4:6]), 14)
-                                            ff_str = date_first_flight.strftime("%Y %b")
-                                        elif len(d) == 4:
-                                            date_first_flight = datetime.datetime(int(d[:4]), 6, 14)
-                                            ff_str = date_first_flight.strftime("%Y")
-                                        else:
-                                            raise
+                                                text(flight.seat + ' (' + flight.seat_type + ', ' +
+                                                     flight.cabin + ')')
 
+                                for attr in ['msn', 'ln']:
+                                    if getattr(flight, attr) is not None:
                                         with tag('tr'):
                                             with tag('td'):
-                                                text('airplane age')
+                                                text(attr)
                                             with tag('td'):
-                                                text('{} years'.format(round((datetime.datetime.today() - date_first_flight).days / 365.25)))
+                                                text(getattr(flight, attr))
 
-                                        with tag('tr'):
-                                            with tag('td'):
-                                                text('first flight')
-                                            with tag('td'):
-                                                text(ff_str)
+                                if flight.sta is not None:
+                                    with tag('tr'):
+                                        with tag('td'):
+                                            text('std/sta')
+                                        with tag('td'):
+                                            text('{}/{}'.format(flight.std, flight.sta))
+
+                                if flight.first_flight is not None:
+                                    with tag('tr'):
+                                        with tag('td'):
+                                            text('airplane age')
+                                        with tag('td'):
+                                            text('{} years'.format(flight.airplane_age))
+
+                                    with tag('tr'):
+                                        with tag('td'):
+                                            text('first flight')
+                                        with tag('td'):
+                                            text(flight.first_flight_str)
+
+
+
+
+        return doc.getvalue()
+
+
+def write_head(doc, tag, text, title='Flights', root=''):
+    """Write the head element shared by all pages of the site.
+
+    Parameters
+    ----------
+    doc, tag, text
+        yattag document being written
+    title : str
+        page title
+    root : str
+        relative path from the page to the top of the site, eg '../'
+    """
+    with tag('head'):
+        doc.stag('meta', charset='utf-8')
+        doc.stag('meta', name='robots', content='noindex,nofollow,noimageindex')
+        doc.stag('link', rel='stylesheet', type='text/css', href=root + 'style.css')
+        with tag('script', src=root + 'toggle.js'):
+            pass
+        with tag('script', src=root + 'search.js', defer='defer'):
+            pass
+        with tag('title'):
+            text(title)
+
+        doc.asis('<link rel="preconnect" href="https://fonts.googleapis.com">')
+        doc.asis('<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>')
+        doc.asis('<link href="https://fonts.googleapis.com/css2?family=Jost:wght@400;500&display=swap" rel="stylesheet">')
+        # doc.asis('<link href="https://fonts.googleapis.com/css2?family=Kumbh+Sans:wght@400;500&display=swap" rel="stylesheet">')
+        doc.asis('<link href="https://fonts.googleapis.com/css2?family=Average+Sans&display=swap" rel="stylesheet">')
+        
+        doc.asis('<!-- Global site tag (gtag.js) - Google Analytics -->')
+        doc.asis('<script async src="https://www.googletagmanager.com/gtag/js?id=G-5NN0B2TQT4"></script>')
+        doc.asis('<script>')
+        doc.asis('window.dataLayer = window.dataLayer || [];')
+        doc.asis('function gtag(){dataLayer.push(arguments);}')
+        doc.asis("gtag('js', new Date());")
+        doc.asis("gtag('config', 'G-5NN0B2TQT4');")
+        doc.asis('</script>')
+
+
+def write_map_thumb(doc, tag, filename):
+    """Write a map thumbnail linking to the full size map.
+
+    The browser picks the size for the screen's pixel density from the
+    files written by save_figure, preferring WebP, and only fetches it when
+    the thumbnail is about to be scrolled into view.
 
+    Parameters
+    ----------
+    doc, tag
+        yattag document being written
+    filename : str
+        file name of the full size PNG, eg 'earth.png'
+    """
+    def srcset(fmt):
+        return ', '.join('{} {}x'.format(variant_name(filename, size, fmt), density)
+                         for density, size in enumerate(map_sizes, start=1))
 
+    with tag('a', href=filename, target='_blank'):
+        with tag('picture'):
+            doc.stag('source', type='image/webp', srcset=srcset('webp'))
+            doc.stag('img', src=variant_name(filename, 'thumb'), srcset=srcset('png'),
+                     loading='lazy', klass='maps_thumbs')
 
 
-        return indent(doc.getvalue())
+def make_html(flights, airports, network=None, links=True):
+    """Generate the HTML of the main page.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    airports : dict
+        Airports database dict
+    network : RouteNetwork
+        route network of the flights, built here if None
+    links : bool
+        link airports, airlines, types and registrations to the pages
+        written by make_pages
+    """
+    if network is None:
+        network = RouteNetwork(flights)
 
-def make_html(flights, airports):
     doc, tag, text = Doc().tagtext()
 
     with tag('html'):
-        with tag('head'):
-            doc.stag('meta', charset='utf-8')
-            doc.stag('meta', name='robots', content='noindex,nofollow,noimageindex')
-            doc.stag('link', rel='stylesheet', type='text/css', href='style.css')
-            with tag('script', src='toggle.js'):
-                pass
-            with tag('script', src='jquery-3.1.1.slim.min.js'):
-                pass
-            with tag('title'):
-                text('Flights')
-
-            doc.asis('<link rel="preconnect" href="https://fonts.googleapis.com">')
-            doc.asis('<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>')
-            doc.asis('<link href="https://fonts.googleapis.com/css2?family=Jost:wght@400;500&display=swap" rel="stylesheet">')
-            # doc.asis('<link href="https://fonts.googleapis.com/css2?family=Kumbh+Sans:wght@400;500&display=swap" rel="stylesheet">')
-            doc.asis('<link href="https://fonts.googleapis.com/css2?family=Average+Sans&display=swap" rel="stylesheet">')
-            
-            doc.asis('<!-- Global site tag (gtag.js) - Google Analytics -->')
-            doc.asis('<script async src="https://www.googletagmanager.com/gtag/js?id=G-5NN0B2TQT4"></script>')
-            doc.asis('<script>')
-            doc.asis('window.dataLayer = window.dataLayer || [];')
-            doc.asis('function gtag(){dataLayer.push(arguments);}')
-            doc.asis("gtag('js', new Date());")
-            doc.asis("gtag('config', 'G-5NN0B2TQT4');")
-            doc.asis('</script>')
-
-        with tag('body', onload='clean(document.body)'):
-            with tag('div', klass='titles', onclick='toggle("airplanes","airplanesud");clean(document.body)'):
-                with tag('span', id='airplanesud', klass='downarrow'):
+        write_head(doc, tag, text)
+
+        with tag('body'):
+            with tag('div', ('data-section', 'airplanes'), klass='titles'):
+                with tag('span', klass='downarrow'):
                     text()
                 text('Airplanes')
             doc.stag('hr')
 
             with tag('div', id='airplanes', klass='tab_closed'):
-                table = HtmlTableAirplanes(flights, ['manufacturer', 'type2'], title='Airplanes')
+                table = HtmlTableAirplanes(flights, ['manufacturer', 'type2'], title='Airplanes',
+                                           kind='type' if links else None)
                 doc.asis(str(table))
 
-                table = HtmlTableDropdown(flights, 'mkt_cxr', 'adm_cxr', title='Airlines')
+                table = HtmlTableDropdown(flights, 'mkt_cxr', 'adm_cxr', title='Airlines',
+                                          kind='airline' if links else None)
                 doc.asis(str(table))
 
                 table = HtmlTableAirplanes(flights, ['manufacturer'], title='Manufacturers')
@@ -550,14 +692,14 @@ def make_html(flights, airports):
 
 
 
-            with tag('div', klass='titles', onclick='toggle("locations","locationsud");clean(document.body)'):
-                with tag('span', id='locationsud', klass='downarrow'):
+            with tag('div', ('data-section', 'locations'), klass='titles'):
+                with tag('span', klass='downarrow'):
                     text()
                 text('Locations')
             doc.stag('hr')
 
             with tag('div', id='locations', klass='tab_closed'):
-                table = HtmlTableLocations(flights, airports, title='Airports')
+                table = HtmlTableLocations(flights, airports, title='Airports', links=links)
                 doc.asis(str(table))
 
                 table = HtmlTableCities(flights, airports)
@@ -574,8 +716,8 @@ def make_html(flights, airports):
 
 
 
-            with tag('div', klass='titles', onclick='toggle("misc","miscud");clean(document.body)'):
-                with tag('span', id='miscud', klass='downarrow'):
+            with tag('div', ('data-section', 'misc'), klass='titles'):
+                with tag('span', klass='downarrow'):
                     text()
                 text('Misc')
             doc.stag('hr')
@@ -590,37 +732,62 @@ def make_html(flights, airports):
 
 
 
-            with tag('div', klass='titles', onclick='toggle("maps","mapsud");clean(document.body)'):
-                with tag('span', id='mapsud', klass='uparrow'):
+            with tag('div', ('data-section', 'network'), klass='titles'):
+                with tag('span', klass='downarrow'):
+                    text()
+                text('Network')
+            doc.stag('hr')
+
+            with tag('div', id='network', klass='tab_closed'):
+                table = HtmlTableRoutes(network)
+                doc.asis(str(table))
+
+                table = HtmlTableHubs(network)
+                doc.asis(str(table))
+
+                table = NetworkTable(network)
+                doc.asis(str(table))
+
+
+
+            with tag('div', ('data-section', 'maps'), klass='titles'):
+                with tag('span', klass='uparrow'):
                     text()
                 text('Maps')
             doc.stag('hr')
 
             with tag('div', id='maps', style='margin-bottom:18px;display:block;'):
                 with tag('div'):
-                    with tag('a', href='america.png', target='_blank'):
-                        doc.stag('img', src='america.png', klass='maps_thumbs')
+                    write_map_thumb(doc, tag, 'america.png')
+                    write_map_thumb(doc, tag, 'earth.png')
+                    write_map_thumb(doc, tag, 'europe.png')
 
-                    with tag('a', href='earth.png', target='_blank'):
-                        doc.stag('img', src='earth.png', klass='maps_thumbs')
 
-                    with tag('a', href='europe.png', target='_blank'):
-                        doc.stag('img', src='europe.png', klass='maps_thumbs')
 
 
 
 
+            with tag('div', ('data-section', 'search'), klass='titles'):
+                with tag('span', klass='downarrow'):
+                    text()
+                text('Search')
+            doc.stag('hr')
 
+            with tag('div', id='search', klass='tab_closed'):
+                doc.stag('input', id='search-box', type='search', autocomplete='off',
+                         placeholder='Flight, registration, airport, airline or airplane')
+                with tag('table', id='search-results', klass='log-table'):
+                    pass
 
-            with tag('div', klass='titles', onclick='toggle("log","logud");clean(document.body)'):
-                with tag('span', id='logud', klass='uparrow'):
+            with tag('div', ('data-section', 'log'), klass='titles'):
+                with tag('span', klass='uparrow'):
                     text()
                 text('Log')
             doc.stag('hr')
 
             with tag('div', id='log', style='margin-bottom:18px;display:block;'):
                 with tag('div'):
-                    table = LogTable(flights, airports)
+                    table = LogTable(flights, airports, links=links)
                     doc.asis(str(table))
 
 
@@ -630,9 +797,4 @@ def make_html(flights, airports):
 
 
 
-        with tag('script', id='jsbin-javascript'):
-            text('$(".log-table td a.expand").click(function(){$(this).closest("tr").next().toggle();});')
-        with tag('script'):
-            doc.asis('function clean(node){for(var n = 0; n < node.childNodes.length; n ++){var child = node.childNodes[n];if(child.nodeType === 8 || (child.nodeType === 3 && !/\S/.test(child.nodeValue))){node.removeChild(child);n --;}else if(child.nodeType === 1){clean(child);}}}')
-
-    return indent(doc.getvalue())
+    return doc.getvalue()
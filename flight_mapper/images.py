@@ -0,0 +1,80 @@
+import io
+import os
+
+from PIL import Image
+
+
+# Smaller copies of each map, by name and height in pixels. Thumbnails are
+# shown 200px high, so 'thumb' is for ordinary and 'medium' for high
+# density screens; the full size image is kept for viewing on its own.
+map_sizes = {'thumb': 200, 'medium': 400}
+
+# Formats written for every size, the first being the fallback for
+# browsers without support for the others
+map_formats = ['png', 'webp']
+
+
+def variant_name(filename, size=None, fmt='png'):
+    """File name of one size and format of an image, eg
+    variant_name('earth.png', 'thumb', 'webp') -> 'earth-thumb.webp'.
+
+    size None is the full size image, which keeps the original name apart
+    from its extension.
+    """
+    stem = os.path.splitext(filename)[0]
+    if size is not None:
+        stem += '-' + size
+    return stem + '.' + fmt
+
+
+def variant_names(filename):
+    """All the files save_figure writes for filename."""
+    return [variant_name(filename, size, fmt)
+            for size in [None] + list(map_sizes) for fmt in map_formats]
+
+
+def save_figure(fig, path, **kwargs):
+    """Save a figure at every size in map_sizes, as PNG and WebP.
+
+    The figure is drawn once, and the smaller sizes are resampled from the
+    full size image rather than drawn again. PNGs are written optimised and
+    WebPs lossy, which for maps is a fraction of the size at no visible
+    cost.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+    path : str
+        file path of the full size PNG; the other files are named by
+        variant_name
+    kwargs
+        passed to fig.savefig, eg bbox_inches='tight'
+
+    Returns
+    -------
+    list
+        paths of the files written
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', **kwargs)
+    buf.seek(0)
+    full = Image.open(buf)
+    full.load()
+    if full.mode != 'RGB':
+        full = full.convert('RGB')
+
+    images = {None: full}
+    for size, height in map_sizes.items():
+        width = max(1, round(full.width * height / full.height))
+        images[size] = full.resize((width, height), Image.LANCZOS) if height < full.height else full
+
+    paths = []
+    for size, image in images.items():
+        for fmt in map_formats:
+            out = variant_name(path, size, fmt)
+            if fmt == 'png':
+                image.save(out, format='PNG', optimize=True)
+            else:
+                image.save(out, format='WEBP', quality=85, method=4)
+            paths.append(out)
+    return paths
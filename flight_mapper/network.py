@@ -0,0 +1,185 @@
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+
+
+class RouteNetwork:
+    def __init__(self, flights):
+        """The airports visited and the legs flown between them, as a graph.
+
+        The graph is built in one pass over the legs into sparse matrices
+        whose rows and columns are airports, so that the analytics below are
+        vectorised over all airports at once.
+
+        Parameters
+        ----------
+        flights : list
+            list of Flights
+
+        Attributes
+        ----------
+        airports : list
+            Airports, in the order of the rows and columns
+        counts : scipy.sparse.csr_matrix
+            counts[i, j] is the number of legs flown from airports[i] to
+            airports[j]
+        distances : scipy.sparse.csr_matrix
+            great circle distance in statute miles of every pair of airports
+            with a leg between them, in either direction
+        """
+        index = {}
+        self.airports = []
+        origins = []
+        destinations = []
+        for flight in flights:
+            for leg in flight.route:
+                for airport in leg:
+                    if airport.code not in index:
+                        index[airport.code] = len(self.airports)
+                        self.airports.append(airport)
+                origins.append(index[leg[0].code])
+                destinations.append(index[leg[1].code])
+
+        n = len(self.airports)
+        origins = np.array(origins, dtype=np.int32)
+        destinations = np.array(destinations, dtype=np.int32)
+        self.counts = scipy.sparse.csr_matrix(
+            (np.ones(len(origins)), (origins, destinations)), shape=(n, n))
+        self.counts.sum_duplicates()
+
+        # Legs from an airport back to itself (eg returning after a
+        # diversion) are counted, but are not edges of the graph
+        links = self.counts + self.counts.T
+        links.setdiag(0)
+        links.eliminate_zeros()
+        links = scipy.sparse.triu(links).tocoo()
+
+        lat = np.radians([airport.lat for airport in self.airports])
+        lon = np.radians([airport.lon for airport in self.airports])
+        i, j = links.row, links.col
+        r = 3963.19
+        d = 2 * r * np.arcsin(np.sqrt(np.sin((lat[j] - lat[i]) / 2)**2 +
+                                      np.cos(lat[i]) * np.cos(lat[j]) * np.sin((lon[j] - lon[i]) / 2)**2))
+        self.distances = scipy.sparse.csr_matrix(
+            (np.concatenate((d, d)), (np.concatenate((i, j)), np.concatenate((j, i)))), shape=(n, n))
+
+        self._hops = None
+
+    def top_routes(self, n=10):
+        """The most flown routes, counting both directions together.
+
+        Returns
+        -------
+        list
+            list of ((Airport, Airport), count), most flown first
+        """
+        links = scipy.sparse.triu(self.counts + self.counts.T, k=1).tocoo()
+        order = np.lexsort((links.col, links.row, -links.data))[:n]
+        return [((self.airports[links.row[k]], self.airports[links.col[k]]), int(links.data[k]))
+                for k in order]
+
+    def degree(self):
+        """Number of other airports each airport has a route to or from."""
+        return np.diff(self.distances.indptr)
+
+    def hops(self):
+        """Matrix of the fewest legs needed between every pair of airports,
+        inf where there is no chain of legs between them."""
+        if self._hops is None:
+            self._hops = scipy.sparse.csgraph.shortest_path(
+                self.distances, directed=False, unweighted=True)
+        return self._hops
+
+    def closeness(self):
+        """Closeness centrality of each airport, from 0 to 1.
+
+        This is the reciprocal of the mean number of legs to every other
+        airport in its component, scaled by the fraction of all airports in
+        that component, so that hubs of small islands of routes rank low.
+        """
+        n = len(self.airports)
+        hops = self.hops()
+        reachable = np.isfinite(hops)
+        total = np.where(reachable, hops, 0).sum(axis=1)
+        others = reachable.sum(axis=1) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            centrality = np.where(total > 0, others / total * others / max(n - 1, 1), 0.0)
+        return centrality
+
+    def hubs(self, n=10):
+        """The best connected airports.
+
+        Returns
+        -------
+        list
+            list of (Airport, degree, closeness), by degree then closeness
+        """
+        degree = self.degree()
+        closeness = self.closeness()
+        order = np.lexsort((-closeness, -degree))[:n]
+        return [(self.airports[k], int(degree[k]), float(closeness[k])) for k in order]
+
+    def components(self):
+        """The groups of airports connected by chains of legs.
+
+        Returns
+        -------
+        list
+            list of lists of Airports, largest group first
+        """
+        num, labels = scipy.sparse.csgraph.connected_components(self.distances, directed=False)
+        sizes = np.bincount(labels, minlength=num)
+        return [[self.airports[k] for k in np.nonzero(labels == label)[0]]
+                for label in np.argsort(-sizes, kind='stable')]
+
+    def chain(self, origin, destination):
+        """The chain of legs between two airports with the fewest stops, and
+        of those the shortest distance.
+
+        Parameters
+        ----------
+        origin : str
+            internal code of the first airport
+        destination : str
+            internal code of the last airport
+
+        Returns
+        -------
+        list
+            Airports from origin to destination, or None if no chain of legs
+            joins them
+        """
+        codes = [airport.code for airport in self.airports]
+        if origin not in codes or destination not in codes:
+            raise ValueError(f'No legs flown to or from {origin if origin not in codes else destination}')
+        i, j = codes.index(origin), codes.index(destination)
+        if not np.isfinite(self.hops()[i, j]):
+            return None
+        return self._chain(i, j)
+
+    def _chain(self, i, j):
+        # Weight every leg so that one more stop always costs more than any
+        # difference in distance, then take the shortest path by weight
+        weights = self.distances.copy()
+        weights.data = 1.0 + weights.data / (self.distances.data.sum() + 1.0)
+        _, predecessors = scipy.sparse.csgraph.shortest_path(
+            weights, directed=False, indices=i, return_predecessors=True)
+        path = [j]
+        while path[-1] != i:
+            path.append(predecessors[path[-1]])
+        return [self.airports[k] for k in path[::-1]]
+
+    def diameter(self):
+        """The longest of the shortest chains between any two airports.
+
+        Returns
+        -------
+        list
+            Airports along the chain, or an empty list if there are no legs
+        """
+        hops = self.hops()
+        if hops.size == 0:
+            return []
+        hops = np.where(np.isfinite(hops), hops, -1)
+        i, j = np.unravel_index(np.argmax(hops), hops.shape)
+        return self._chain(i, j)
@@ -0,0 +1,264 @@
+import collections
+import hashlib
+import json
+import multiprocessing
+import os
+from yattag import Doc
+
+from .html import HtmlTable, LogTable, page_kinds, slugify, write_head, write_map_thumb
+from .images import save_figure, variant_names
+
+
+_flight_fields = ['route_string', 'date', 'desig', 'mkt_cxr', 'adm_cxr', 'number', 'type2',
+                  'type3', 'manufacturer', 'registration', 'seat_type', 'cabin', 'seat', 'msn',
+                  'ln', 'first_flight', 'num_engines', 'engines', 'std', 'sta', 'atd', 'ata',
+                  'pics', 'airplane_age']
+
+# Read-only data shared by every page, set once per worker process
+_shared = {}
+
+# Version of the page layout, part of every page's fingerprint so that a
+# change to make_entity_html rewrites pages left by older builds
+_layout = 2
+
+
+def group_flights(flights):
+    """Find the flights belonging to each entity page.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+
+    Returns
+    -------
+    dict
+        keys = (kind, name), values = list of indices into flights
+    """
+    groups = collections.defaultdict(list)
+    for i, flight in enumerate(flights):
+        codes = []
+        for leg in flight.route:
+            for airport in leg:
+                if airport.code not in codes:
+                    codes.append(airport.code)
+        for code in codes:
+            groups[('airport', code)].append(i)
+
+        for kind, attr in [('airline', 'mkt_cxr'), ('type', 'type2'), ('registration', 'registration')]:
+            name = getattr(flight, attr)
+            if name is not None and name != '':
+                groups[(kind, name)].append(i)
+
+    return dict(groups)
+
+
+def flight_digest(flight):
+    """Fingerprint of everything about a flight which appears on a page."""
+    h = hashlib.sha1()
+    for attr in _flight_fields:
+        h.update(repr(getattr(flight, attr)).encode('utf-8'))
+    h.update(route_digest(flight).encode('ascii'))
+    return h.hexdigest()
+
+
+def route_digest(flight):
+    """Fingerprint of everything about a flight which is drawn on a map."""
+    h = hashlib.sha1()
+    for leg in flight.route:
+        for airport in leg:
+            h.update(f'{airport}|{airport.iata}|{airport.lat}|{airport.lon}'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def make_entity_html(title, flights, airports, distance, map_src=None):
+    """Generate the HTML page for one airport, airline, type or registration.
+
+    Parameters
+    ----------
+    title : str
+        heading of the page
+    flights : list
+        the Flights belonging to this entity
+    airports : dict
+        Airports database dict
+    distance : float
+        total distance of the flights in statute miles
+    map_src : str
+        file name of the map image, or None for no map
+    """
+    doc, tag, text = Doc().tagtext()
+
+    with tag('html'):
+        write_head(doc, tag, text, title=title, root='../')
+
+        with tag('body'):
+            with tag('div', klass='titles'):
+                with tag('a', href='../index.html'):
+                    text('Flights')
+                text(' / ' + title)
+            doc.stag('hr')
+
+            with tag('div', style='margin-bottom:18px;display:block;'):
+                table = HtmlTable('Tallies',
+                                  ['Flights', 'Total distance'],
+                                  [str(len(flights)), '{} mi'.format(round(distance))])
+                doc.asis(str(table))
+
+                if map_src is not None:
+                    write_map_thumb(doc, tag, map_src)
+
+            with tag('div', style='margin-bottom:18px;display:block;'):
+                table = LogTable(flights, airports, root='../')
+                doc.asis(str(table))
+
+    return doc.getvalue()
+
+
+def _init_worker(flights, airports, distances, cache_dir):
+    _shared['flights'] = flights
+    _shared['airports'] = airports
+    _shared['distances'] = distances
+    _shared['cache_dir'] = cache_dir
+
+
+def _write_page(job):
+    kind, name, indices, path, maps, draw_map = job
+    flights = [_shared['flights'][i] for i in indices]
+    distance = sum(_shared['distances'][i] for i in indices)
+
+    map_src = None
+    if maps:
+        map_path = os.path.splitext(path)[0] + '.png'
+        map_src = os.path.basename(map_path)
+
+    if draw_map:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from .plot import plot_map
+
+        visited = {}
+        for flight in flights:
+            for leg in flight.route:
+                for airport in leg:
+                    visited[airport.code] = airport
+
+        fig = plot_map(flights, visited, cache_dir=_shared['cache_dir'])
+        save_figure(fig, map_path, bbox_inches='tight')
+        plt.close(fig)
+
+    title = name
+    if kind == 'airport':
+        title = str(_shared['airports'][name])
+
+    with open(path, mode='w') as f:
+        f.write(make_entity_html(title, flights, _shared['airports'], distance, map_src=map_src))
+
+    return path
+
+
+def make_pages(flights, airports, outdir, processes=None, maps=True, cache_dir=None):
+    """Write a page for every airport, airline, airplane type and registration.
+
+    Aggregates shared by all pages are computed once here and handed to each
+    worker process when it starts, so the workers never re-read the data. A
+    manifest of page fingerprints is kept in the output directory, and pages
+    whose flights are unchanged since the last build are not rewritten. The
+    manifest keeps a separate fingerprint of the routes on each page, and a
+    page's map is only redrawn when they change.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    airports : dict
+        Airports database dict
+    outdir : str
+        top directory of the site
+    processes : int
+        number of worker processes, defaults to the number of CPUs; 1 writes
+        the pages in this process
+    maps : bool
+        whether to draw a map for each page
+    cache_dir : str
+        directory of the basemap geometry cache, see plot_map
+
+    Returns
+    -------
+    dict
+        keys = 'written', 'unchanged', 'removed', values = lists of file paths
+    """
+    manifest_path = os.path.join(outdir, 'pages.json')
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    for dirname in page_kinds.values():
+        os.makedirs(os.path.join(outdir, dirname), exist_ok=True)
+
+    digests = [flight_digest(flight) for flight in flights]
+    route_digests = [route_digest(flight) for flight in flights]
+    distances = [flight.distance for flight in flights]
+
+    jobs = []
+    new_manifest = {}
+    unchanged = []
+    for (kind, name), indices in group_flights(flights).items():
+        relpath = os.path.join(page_kinds[kind], slugify(name) + '.html')
+        path = os.path.join(outdir, relpath)
+
+        h = hashlib.sha1(f'{kind}|{name}|{maps}|{_layout}'.encode('utf-8'))
+        for i in indices:
+            h.update(digests[i].encode('ascii'))
+        digest = h.hexdigest()
+
+        # The map only depends on the routes, so editing anything else about
+        # the flights rewrites the page but keeps its map
+        map_digest = None
+        if maps:
+            h = hashlib.sha1()
+            for i in indices:
+                h.update(route_digests[i].encode('ascii'))
+            map_digest = h.hexdigest()
+        new_manifest[relpath] = {'html': digest, 'map': map_digest}
+
+        old = manifest.get(relpath)
+        if not isinstance(old, dict):
+            old = {}
+        map_path = os.path.splitext(path)[0] + '.png'
+        draw_map = maps and (old.get('map') != map_digest or not os.path.exists(map_path))
+        if old.get('html') == digest and os.path.exists(path) and not draw_map:
+            unchanged.append(path)
+        else:
+            jobs.append((kind, name, indices, path, maps, draw_map))
+
+    removed = []
+    for relpath in manifest:
+        if relpath not in new_manifest:
+            path = os.path.join(outdir, relpath)
+            for stale in [path] + [os.path.join(os.path.dirname(path), name) for name in
+                                   variant_names(os.path.basename(path))]:
+                if os.path.exists(stale):
+                    os.remove(stale)
+            removed.append(path)
+
+    written = []
+    if processes == 1:
+        _init_worker(flights, airports, distances, cache_dir)
+        written = [_write_page(job) for job in jobs]
+    elif jobs:
+        # The build runs this in a thread alongside others, where forking
+        # can deadlock, so the workers are spawned
+        with multiprocessing.get_context('spawn').Pool(
+                processes, initializer=_init_worker,
+                initargs=(flights, airports, distances, cache_dir)) as pool:
+            for path in pool.imap_unordered(_write_page, jobs, chunksize=8):
+                written.append(path)
+
+    with open(manifest_path, mode='w') as f:
+        json.dump(new_manifest, f, indent=1, sort_keys=True)
+
+    return {'written': written, 'unchanged': unchanged, 'removed': removed}
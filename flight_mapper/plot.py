@@ -1,65 +1,62 @@
 import collections
+import numpy as np
 import matplotlib.pyplot as plt
-import cartopy.feature
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import FancyBboxPatch
+from matplotlib.textpath import TextPath
 import cartopy.crs as ccrs
-from cartopy.feature.nightshade import Nightshade
-import cartopy.feature as cfeature
+
+from .geometry import features, load_geometry, view_features, view_projection, views
 
 
 def plot_map(flights,
              airports,
              europe=False,
-             america=False):
+             america=False,
+             cache_dir=None):
+    """Draw the routes flown and the airports on a map.
 
-    if europe:
-        labels = True
-        states = False
-        projection = ccrs.Mercator(max_latitude=71.5, min_latitude=35.5,)
-        projection._threshold = projection._threshold / 100.0
+    The land, sea and borders are drawn from the geometry cache, already
+    clipped to the view and projected, see flight_mapper.geometry.
 
-        fig = plt.figure(figsize=(10.5, 10.5))
-        ax = fig.add_subplot(1, 1, 1, projection=projection)
-        # ax.set_global()
-        ax.set_extent((-24, 30, 35.5, 71.5), crs=ccrs.PlateCarree())
-        bounds = (-24, 30, 35.5, 71.5)
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    airports : dict
+        Airports to mark
+    europe : bool
+        draw the Europe view
+    america : bool
+        draw the North America view, otherwise the whole world is drawn
+    cache_dir : str
+        directory of the geometry cache, defaults to default_cache_dir
 
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    if europe:
+        view = 'europe'
     elif america:
-        labels = True
-        states = True
-        projection = ccrs.Mercator(max_latitude=62, min_latitude=-65)
-        projection._threshold = projection._threshold / 100.0
-
-        fig = plt.figure(figsize=(14, 14))
-        ax = fig.add_subplot(1, 1, 1, projection=projection)
-        # ax.set_global()
-        ax.set_extent((-160, -58, 16.5, 62), crs=ccrs.PlateCarree())
-        bounds = (-160, -58, 16.5, 62)
-
+        view = 'america'
     else:
-        labels = False
-        states = False
-        projection = ccrs.Mercator(max_latitude=80, min_latitude=-65)
-        projection._threshold = projection._threshold / 100.0
+        view = 'earth'
+    config = views[view]
+    projection = view_projection(view)
 
-        fig = plt.figure(figsize=(15, 15))
-        ax = fig.add_subplot(1, 1, 1, projection=projection)
+    fig = plt.figure(figsize=(config['figsize'], config['figsize']))
+    ax = fig.add_subplot(1, 1, 1, projection=projection)
+    if config['extent'] is None:
         ax.set_global()
         bounds = (-180, 180, -90, 90)
+    else:
+        ax.set_extent(config['extent'], crs=ccrs.PlateCarree())
+        bounds = config['extent']
 
-
-    ax.add_feature(cartopy.feature.LAND, color='moccasin')
-    ax.add_feature(cartopy.feature.OCEAN, color='cornflowerblue', alpha=0.6)
-    ax.add_feature(cartopy.feature.LAKES, color='cornflowerblue', alpha=0.6)
-    ax.add_feature(cartopy.feature.COASTLINE,linewidth=0.3)
-    ax.add_feature(cartopy.feature.BORDERS, linewidth=0.3)
-    if states:
-        usa_states = cfeature.NaturalEarthFeature(
-            category='cultural',
-            name='admin_1_states_provinces_lines',
-            scale='110m',
-            edgecolor='k',
-            facecolor='none')
-        ax.add_feature(usa_states, linewidth=0.3)
+    for feature in view_features(view):
+        ax.add_geometries(load_geometry(view, feature, cache_dir), crs=projection,
+                          **features[feature]['style'])
 
     airport_counts = collections.Counter()
     for flight in flights:
@@ -75,21 +72,112 @@ def plot_map(flights,
                     zorder=100,
                     transform=ccrs.Geodetic())
 
-    texts = []
-    for airport in airports.values():
-        ax.scatter(
-            airport.lon, airport.lat,
-            color='k', s=20, zorder=101, transform=ccrs.PlateCarree())
-        ax.scatter(
-            airport.lon, airport.lat,
-            color='white', s=3.25, zorder=102, transform=ccrs.PlateCarree())
-
-        if labels:
-            if bounds[0] < airport.lon < bounds[1] and bounds[2] < airport.lat < bounds[3]:
-                t = ax.text(airport.lon, airport.lat, airport.iata, size=6.75,
-                    zorder=103 + airport_counts[airport],
-                    transform=ccrs.PlateCarree(), ha='center', va='center',
-                    bbox={'facecolor': 'white', 'alpha': 1.0, 'edgecolor': 'k',
-                          'boxstyle': 'round'})
+    lons = np.array([airport.lon for airport in airports.values()], dtype=float)
+    lats = np.array([airport.lat for airport in airports.values()], dtype=float)
+    ax.scatter(lons, lats, color='k', s=20, zorder=101, transform=ccrs.PlateCarree())
+    ax.scatter(lons, lats, color='white', s=3.25, zorder=102, transform=ccrs.PlateCarree())
+
+    if config['labels']:
+        in_bounds = [airport for airport in airports.values() if airport.iata
+                     and bounds[0] < airport.lon < bounds[1] and bounds[2] < airport.lat < bounds[3]]
+        # Busiest airports first, so they win any collisions
+        in_bounds.sort(key=lambda a: (-airport_counts[a], a.iata or a.name))
+        draw_labels(fig, ax, in_bounds, [airport.iata for airport in in_bounds])
 
     return fig
+
+
+def place_labels(xy, widths, heights):
+    """Choose which labels to draw so that none overlap.
+
+    Labels are accepted greedily in the order given, so they should be
+    sorted by priority. Accepted labels are kept in a uniform grid with cells
+    as large as the largest label, so each candidate is only tested against
+    the labels in the 3x3 block of cells around it.
+
+    Parameters
+    ----------
+    xy : np.ndarray
+        array of shape (n, 2) of label centres in screen space
+    widths : np.ndarray
+        label widths in the same units
+    heights : np.ndarray
+        label heights in the same units
+
+    Returns
+    -------
+    list
+        indices of the labels to draw
+    """
+    if len(xy) == 0:
+        return []
+
+    cell_w = max(widths.max(), 1e-9)
+    cell_h = max(heights.max(), 1e-9)
+    grid = collections.defaultdict(list)
+    kept = []
+    for i, ((x, y), w, h) in enumerate(zip(xy, widths, heights)):
+        cx = int(np.floor(x / cell_w))
+        cy = int(np.floor(y / cell_h))
+        collides = False
+        for nx in (cx - 1, cx, cx + 1):
+            for ny in (cy - 1, cy, cy + 1):
+                for j in grid[(nx, ny)]:
+                    if abs(x - xy[j, 0]) * 2 < w + widths[j] and abs(y - xy[j, 1]) * 2 < h + heights[j]:
+                        collides = True
+                        break
+                if collides:
+                    break
+            if collides:
+                break
+
+        if not collides:
+            grid[(cx, cy)].append(i)
+            kept.append(i)
+
+    return kept
+
+
+def draw_labels(fig, ax, airports, names, size=6.75):
+    """Draw non-overlapping airport labels with rounded boxes.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+    ax : cartopy.mpl.geoaxes.GeoAxes
+    airports : list
+        Airports to label, highest priority first
+    names : list
+        label text for each airport
+    size : float
+        font size in points
+    """
+    if len(airports) == 0:
+        return
+
+    # Sizes in inches, so that they stay valid whatever dpi the figure is saved at
+    pad = 0.3 * size / 72
+    extents = [TextPath((0, 0), name, size=size).get_extents() for name in names]
+    widths = np.array([e.width / 72 + 2 * pad for e in extents])
+    heights = np.array([size / 72 + 2 * pad for e in extents])
+
+    lons = np.array([airport.lon for airport in airports], dtype=float)
+    lats = np.array([airport.lat for airport in airports], dtype=float)
+    projected = ax.projection.transform_points(ccrs.PlateCarree(), lons, lats)[:, :2]
+
+    ax.apply_aspect()
+    xy = ax.transData.transform(projected) / fig.dpi
+
+    kept = place_labels(xy, widths, heights)
+
+    boxes = [FancyBboxPatch((-widths[i] / 2 + pad, -heights[i] / 2 + pad),
+                            widths[i] - 2 * pad, heights[i] - 2 * pad,
+                            boxstyle=f'round,pad={pad}') for i in kept]
+    ax.add_collection(PatchCollection(boxes, facecolor='white', edgecolor='k', linewidth=1.0,
+                                      zorder=103, transform=fig.dpi_scale_trans,
+                                      offsets=projected[kept], offset_transform=ax.transData))
+
+    for i in kept:
+        ax.text(projected[i, 0], projected[i, 1], names[i], size=size, zorder=104,
+                transform=ax.transData, ha='center', va='center')
+
@@ -1,6 +1,9 @@
 
-import pandas
 import datetime
+import functools
+import warnings
+import numpy as np
+import pandas
 
 class Airport:
     def __init__(self,
@@ -48,13 +51,15 @@ class Airport:
 
         return s
 
-    def write_airport(self, airport_type='normal'):
+    def write_airport(self, airport_type='normal', href=None):
         """Generate the HTML representation of an airport.
 
         Parameters
         ----------
         airport_type : str
             'normal', 'scheduled' (but never reached), or 'diverted'
+        href : str
+            URL to link the airport to, or None for no link
 
         Returns
         -------
@@ -83,6 +88,8 @@ class Airport:
             s += '</span>'
 
         s += '</abbr>'
+        if href is not None:
+            s = f'<a href="{href}">{s}</a>'
         return s
 
 
@@ -120,26 +127,18 @@ class Flight:
                  actual_dist=None,
                  fleet=None,
                  plan=None,
-                 config=None):
+                 config=None,
+                 registry=None):
 
+         self.airports = airports
          self.route_string = route
-         self.date = date
+         self.date_string = date
          self.desig = desig
-         self.mkt_cxr = mkt_cxr
-         self.adm_cxr = adm_cxr or ''
          self.number = number
          self.type2 = type2
-         self.type3 = type3
-         self.manufacturer = manufacturer
-         self.registration = registration
          self.seat_type = seat_type
          self.cabin = cabin
          self.seat = seat
-         self.msn = msn
-         self.ln = ln
-         self.first_flight = first_flight
-         self.num_engines = num_engines
-         self.engines = engines
          self.std = std
          self.sta = sta
          self.atd = atd
@@ -148,70 +147,343 @@ class Flight:
          if self.pics is not None:
              self.pics = pics.split(';')
 
-         self.parse_route(self.route_string, airports)
+         if registry is None:
+             registry = Registry()
+         self.carrier = registry.get_carrier(mkt_cxr)
+         self.operator = registry.get_carrier(adm_cxr) if adm_cxr else None
+         self.aircraft = registry.get_aircraft(registration=registration,
+                                               msn=msn,
+                                               ln=ln,
+                                               first_flight=first_flight,
+                                               engines=engines,
+                                               num_engines=num_engines,
+                                               manufacturer=manufacturer,
+                                               type3=type3)
+         for shared in (self.carrier, self.operator, self.aircraft):
+             if shared is not None:
+                 shared.flights.append(self)
+
+    # The fields below are derived on first use and then cached, so that
+    # builds which never show them (eg maps only) never pay for them.
+
+    @functools.cached_property
+    def date(self):
+        """datetime of the flight."""
+        d = self.date_string
+        return datetime.datetime(int(d[:4]), int(d[4:6]), int(d[6:]))
+
+    @functools.cached_property
+    def route_nodes(self):
+        """list of (code, airport_type) for the route, see parse_route_nodes."""
+        return parse_route_nodes(self.route_string)
+
+    @functools.cached_property
+    def route(self):
+        """list of the segments flown, as (Airport, Airport) tuples.
+
+        Scheduled stops which were never reached are left out, and a
+        diversion airport counts as landed at.
+        """
+        landed = [self.airports[code] for code, airport_type in self.route_nodes
+                  if airport_type != 'scheduled']
+        return list(zip(landed[:-1], landed[1:]))
+
+    @functools.cached_property
+    def route_str(self):
+        """HTML for the route with arrows, abbreviations, and line breaks.
+
+        The route string is a hyphenated sequence of airport codes, with a
+        preceding 's' indicating that the stop was scheduled but never landed
+        and a preceding 'd' indicating that the stop was a diversion. For
+        example, 'ABC-sDEF-dxyz' indicates a scheduled flight from ABC to DEF
+        which never landed at DEF but diverted to xyz.
+        """
+        return self.write_route()
+
+    def write_route(self, link=None):
+        """HTML for the route, as route_str, optionally linking each airport.
+
+        Parameters
+        ----------
+        link : callable
+            called with each Airport to give the URL it links to, or None
+            for no links
+        """
+        href = (lambda airport: None) if link is None else link
+        nodes = self.route_nodes
+        first = self.airports[nodes[0][0]]
+        display_rstring = first.write_airport(href=href(first))
+
+        for pos, (code, airport_type) in enumerate(nodes[1:], start=1):
+            if pos >= 2:
+                display_rstring += '<br><span style="visibility:hidden;">' + nodes[0][0] + '</span>'
+            if airport_type == 'scheduled':
+                display_rstring += ' &#8628; '
+            else:
+                display_rstring += ' &rarr; '
+            airport = self.airports[code]
+            display_rstring += airport.write_airport(airport_type=airport_type, href=href(airport))
+
+        return display_rstring
+
+    @functools.cached_property
+    def distance(self):
+        """Great circle distance flown, in statute miles."""
+        return sum(gc_distance(*leg) for leg in self.route)
+
+    # Carrier and airplane details are held by the shared Carrier and
+    # Aircraft, and exposed here under their original names.
+
+    @property
+    def mkt_cxr(self):
+        return self.carrier.name
+
+    @property
+    def adm_cxr(self):
+        return self.operator.name if self.operator is not None else ''
 
-         self.date = datetime.datetime(int(self.date[:4]), int(self.date[4:6]), int(self.date[6:]))
+    registration = property(lambda self: self.aircraft.registration)
+    msn = property(lambda self: self.aircraft.msn)
+    ln = property(lambda self: self.aircraft.ln)
+    first_flight = property(lambda self: self.aircraft.first_flight)
+    engines = property(lambda self: self.aircraft.engines)
+    num_engines = property(lambda self: self.aircraft.num_engines)
+    manufacturer = property(lambda self: self.aircraft.manufacturer)
+    type3 = property(lambda self: self.aircraft.type3)
+    first_flight_date = property(lambda self: self.aircraft.first_flight_date)
+    first_flight_str = property(lambda self: self.aircraft.first_flight_str)
+    airplane_age = property(lambda self: self.aircraft.age)
 
-    def parse_route(self, route_string, airports):
-        """Generate a list of segments and an HTML route display given a route
-        with diversions and scheduled stops.
 
-        It saves the following attributes
+class Carrier:
+    __slots__ = ('name', 'flights')
 
-        self.route : list
-            a list of lists for each segment eg [['ABC','DEF'], ['DEF', 'GHI']]
-        self.route_str : str
-            HTML for the route with arrows, abbreviations, and line breaks
+    def __init__(self, name):
+        """An airline, shared by all the Flights it marketed or operated.
 
         Parameters
         ----------
-        route_string : str
-            hyphenated sequence of airport codes, with a preceding 's'
-            indicating that the stop was scheduled but never landed and a
-            preceding 'd' indicating that the stop was a diversion.
-            for example, 'ABC-sDEF-dxyz' indicates a scheduled flight from ABC
-            to DEF which never landed at DEF but diverted to xyz.
-        airports : dict
-            Airports database dict
+        name : str
+            name of the airline as written in the flights list
+        """
+        self.name = name
+        self.flights = []
+
+    def __str__(self):
+        return str(self.name)
+
+
+class Aircraft:
+    __slots__ = ('registration', 'msn', 'ln', 'first_flight', 'engines', 'num_engines',
+                 'manufacturer', 'type3', 'flights', '_first_flight_date')
+
+    details = ('ln', 'first_flight', 'engines', 'num_engines', 'manufacturer', 'type3')
+
+    def __init__(self,
+                 registration=None,
+                 msn=None,
+                 ln=None,
+                 first_flight=None,
+                 engines=None,
+                 num_engines=None,
+                 manufacturer=None,
+                 type3=None):
+        """An individual airplane, shared by all the Flights made on it.
+
+        Parameters
+        ----------
+        registration : str
+            tail registration, eg 'EI-DVN'
+        msn : str
+            manufacturer serial number
+        """
+        self.registration = registration
+        self.msn = msn
+        self.ln = ln
+        self.first_flight = first_flight
+        self.engines = engines
+        self.num_engines = num_engines
+        self.manufacturer = manufacturer
+        self.type3 = type3
+        self.flights = []
+        self._first_flight_date = None
+
+    def __str__(self):
+        return f'{self.manufacturer} {self.type3} ({self.registration})'
+
+    def conflicts(self, msn=None, **details):
+        """Names of the details which disagree with those already known."""
+        found = [attr for attr, value in details.items()
+                 if value is not None and getattr(self, attr) not in (None, value)]
+        if msn is not None and self.msn not in (None, msn):
+            found.insert(0, 'msn')
+        return found
+
+    def matches(self, **details):
+        """Whether every detail is the same as those already known."""
+        return all(getattr(self, attr) == value for attr, value in details.items())
+
+    @property
+    def first_flight_date(self):
+        """datetime of the first flight, or None if not known.
+
+        Dates given only to the month or year are taken as the middle of it.
         """
-        all_nodes = route_string.split('-')
-
-        route = [all_nodes[0]]
-        display_rstring = airports[all_nodes[0]].write_airport()
-
-        pos = 1
-        for node in all_nodes[1:]:
-            if node[0] == 's' and len(node) == 4:
-                if pos < 2:
-                    display_rstring += ' &#8628; ' + airports[node[1:]].write_airport(airport_type='scheduled')
-                else:
-                    display_rstring += '<br><span style="visibility:hidden;">' + all_nodes[0] + '</span> &#8628; ' +\
-                                       airports[node[1:]].write_airport(airport_type='scheduled')
-            elif node[0] == 'd' and len(node) == 4:
-                if pos < 2:
-                    route.append(node[1:])
-                    display_rstring += ' &rarr; ' + airports[node[1:]].write_airport(airport_type='diverted')
-                else:
-                    route.append(node[1:])
-                    display_rstring += '<br><span style="visibility:hidden;">' + all_nodes[0] + '</span> &rarr; ' +\
-                                       airports[node[1:]].write_airport(airport_type='diverted')
+        d = self.first_flight
+        if d is None:
+            return None
+        if self._first_flight_date is None:
+            if len(d) == 8:
+                self._first_flight_date = datetime.datetime(int(d[:4]), int(d[4:6]), int(d[6:]))
+            elif len(d) == 6:
+                self._first_flight_date = datetime.datetime(int(d[:4]), int(d[4:6]), 14)
+            elif len(d) == 4:
+                self._first_flight_date = datetime.datetime(int(d[:4]), 6, 14)
             else:
-                if pos < 2:
-                    route.append(node)
-                    display_rstring += ' &rarr; ' + airports[node].write_airport()
-                else:
-                    route.append(node)
-                    display_rstring += '<br><span style="visibility:hidden;">' + all_nodes[0] + '</span> &rarr; ' +\
-                                       airports[node].write_airport()
-            pos += 1
+                raise ValueError(f'Invalid first flight date {d}')
+        return self._first_flight_date
+
+    @property
+    def first_flight_str(self):
+        """The first flight, formatted to the precision known."""
+        if self.first_flight is None:
+            return None
+        fmt = {8: '%Y %b %d', 6: '%Y %b', 4: '%Y'}[len(self.first_flight)]
+        return self.first_flight_date.strftime(fmt)
+
+    @property
+    def age(self):
+        """Age at the time of the build in whole years, or None if the first
+        flight is not known."""
+        if self.first_flight_date is None:
+            return None
+        return round((build_date() - self.first_flight_date).days / 365.25)
+
+    @property
+    def distance(self):
+        """Great circle distance flown on this airplane, in statute miles."""
+        return sum(flight.distance for flight in self.flights)
+
+
+class Registry:
+    def __init__(self):
+        """Interned Carriers and Aircraft, so that Flights on the same airline
+        or airplane share one object rather than each holding a copy.
+
+        Attributes
+        ----------
+        carriers : dict
+            keys = names, values = Carriers
+        aircraft : dict
+            keys = (registration, msn), values = lists of Aircraft, one for
+            each distinct set of details written with them
+        registrations : dict
+            keys = registrations, values = lists of every Aircraft with the
+            registration, whatever its msn
+        conflicts : list
+            (Aircraft, Aircraft) pairs with the same registration and msn
+            whose details disagree, and which are therefore kept apart
+        """
+        self.carriers = {}
+        self.aircraft = {}
+        self.registrations = {}
+        self.conflicts = []
+
+    def get_carrier(self, name):
+        if name not in self.carriers:
+            self.carriers[name] = Carrier(name)
+        return self.carriers[name]
+
+    def get_aircraft(self, registration=None, msn=None, **details):
+        """Find or add the Aircraft with this registration, msn and details.
+
+        Lines without an msn share the Aircraft (registration, None), apart
+        from any airplane seen with an msn, so that every Flight shows the
+        details written on its own line. Each distinct set of details given
+        with a registration and msn is interned as an Aircraft of its own,
+        with a warning the first time it disagrees with a detail known to
+        the first one.
+        """
+        if registration is None:
+            return Aircraft(registration, msn, **details)
+
+        variants = self.aircraft.setdefault((registration, msn), [])
+        for aircraft in variants:
+            if aircraft.matches(**details):
+                return aircraft
+
+        aircraft = Aircraft(registration, msn, **details)
+        if variants:
+            conflicts = variants[0].conflicts(msn, **details)
+            if conflicts:
+                warnings.warn(f'Conflicting {", ".join(conflicts)} for airplane {registration}')
+                self.conflicts.append((variants[0], aircraft))
+        variants.append(aircraft)
+        self.registrations.setdefault(registration, []).append(aircraft)
+        return aircraft
+
+    def tail_flights(self, registration):
+        """All the Flights made on a registration, whatever the msn and
+        details written with them, oldest first."""
+        aircraft = self.registrations.get(registration, [])
+        return sorted((flight for a in aircraft for flight in a.flights), key=lambda f: f.date)
+
+
+@functools.lru_cache(maxsize=None)
+def build_date():
+    """The time of the build, taken once so every page agrees on it."""
+    return datetime.datetime.today()
 
-        for i in range(len(route)-1):
-            route[i] = (airports[route[i]], airports[route[i+1]])
 
-        del(route[-1])
+@functools.lru_cache(maxsize=None)
+def gc_distance(airport1, airport2):
+    """Calculate the distance in statute miles between two airports.
 
-        self.route = route
-        self.route_str = display_rstring
+    Results are cached by airport, so each pair is only computed once
+    however many flights, pages or logs share the Airports.
+
+    Parameters
+    ----------
+    airport1 : Airport
+    airport2 : Airport
+
+    Returns
+    -------
+    float
+        the distance in statute miles between the two airports
+    """
+    p1 = airport1.lat * 2.0 * np.pi/360
+    p2 = airport2.lat * 2.0 * np.pi/360
+    l1 = airport1.lon * 2.0 * np.pi/360
+    l2 = airport2.lon * 2.0 * np.pi/360
+    r = 3963.19
+    gcd = 2 * r * np.arcsin(np.sqrt(np.sin((p2-p1)/2)**2 + np.cos(p1) * np.cos(p2) * np.sin((l2-l1)/2)**2))
+    return gcd
+
+
+def parse_route_nodes(route_string):
+    """Split a route string into its airport codes and stop types.
+
+    Parameters
+    ----------
+    route_string : str
+        hyphenated sequence of airport codes, see Flight.route_str
+
+    Returns
+    -------
+    list
+        a list of (code, airport_type) tuples, where airport_type is
+        'normal', 'scheduled' or 'diverted'
+    """
+    nodes = []
+    for i, node in enumerate(route_string.split('-')):
+        if i > 0 and node[0] == 's' and len(node) == 4:
+            nodes.append((node[1:], 'scheduled'))
+        elif i > 0 and node[0] == 'd' and len(node) == 4:
+            nodes.append((node[1:], 'diverted'))
+        else:
+            nodes.append((node, 'normal'))
+    return nodes
 
 
 def read_airports(filename):
@@ -238,26 +510,49 @@ def read_airports(filename):
     return airports
 
 
-def read_flights(filename, airports):
+def read_flights(filename, airports, registry=None):
     """Read flight info from text database.
 
     Parameters
     ----------
     filename : str
         file path of flights list
+    airports : dict
+        Airports database dict
+    registry : Registry
+        Carriers and Aircraft to share, a new one if None
 
     Returns
     -------
     list
         list of Flights
     """
+    if registry is None:
+        registry = Registry()
+
     flights = []
     with open(filename, 'r') as f:
         for row in f.readlines():
             row = row.strip()
-            data = dict(zip([x.split('=')[0] for x in row.split(',')],
-                        [x.split('=')[1] for x in row.split(',')]))
-            flight = Flight(airports, **data)
+            data = parse_flight_line(row)
+            flight = Flight(airports, registry=registry, **data)
             flights.append(flight)
 
     return flights
+
+
+def parse_flight_line(row):
+    """Split one line of the flights list into its fields.
+
+    Parameters
+    ----------
+    row : str
+        comma separated key=value pairs, eg 'date=20220618,route=DUB-LHR'
+
+    Returns
+    -------
+    dict
+        keys = field names, values = field values as strings
+    """
+    return dict(zip([x.split('=')[0] for x in row.split(',')],
+                    [x.split('=')[1] for x in row.split(',')]))
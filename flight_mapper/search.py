@@ -0,0 +1,138 @@
+import collections
+import json
+import os
+import re
+import unicodedata
+
+
+# Number of leading characters of a token which choose its index shard; the
+# browser needs at least this many characters before it can search
+prefix_len = 2
+
+# Number of flights in each shard of row data
+rows_per_shard = 500
+
+
+def normalize(s):
+    """Split text into lower case ascii words, eg 'Reykjavík' -> ['reykjavik']."""
+    s = unicodedata.normalize('NFKD', s).encode('ascii', 'ignore').decode('ascii')
+    return [word for word in re.split(r'[^a-z0-9]+', s.lower()) if word != '']
+
+
+def search_tokens(flight):
+    """All the words a flight can be found by.
+
+    Parameters
+    ----------
+    flight : Flight
+
+    Returns
+    -------
+    set
+        flight number, registration, airport codes and cities, carriers, and
+        airplane manufacturer and types
+    """
+    tokens = set()
+    if flight.number is not None:
+        tokens.update(normalize((flight.desig or '') + flight.number))
+    if flight.registration is not None:
+        tokens.update(normalize(flight.registration))
+        tokens.update(normalize(flight.registration.replace('-', '')))
+
+    for airport in _landed(flight):
+        for field in (airport.code, airport.iata, airport.icao, airport.city):
+            if isinstance(field, str):
+                tokens.update(normalize(field))
+
+    for field in (flight.mkt_cxr, flight.adm_cxr, flight.manufacturer, flight.type2, flight.type3):
+        if field:
+            tokens.update(normalize(field))
+
+    return tokens
+
+
+def _landed(flight):
+    """The Airports a flight landed at or left from, in order.
+
+    Unlike flight.route this includes the origin of a flight which never
+    landed anywhere else, eg 'ABC-sDEF'.
+    """
+    return [flight.airports[code] for code, airport_type in flight.route_nodes
+            if airport_type != 'scheduled']
+
+
+def search_row(flight):
+    """The compact summary of a flight shown in search results."""
+    route = '-'.join(airport.iata or airport.code for airport in _landed(flight))
+    return [flight.date.strftime('%Y %b %d'),
+            (flight.desig or '') + (flight.number or ''),
+            route,
+            flight.mkt_cxr,
+            f'{flight.manufacturer} {flight.type3} ({flight.registration})']
+
+
+def build_index(flights):
+    """Build the inverted index from tokens to flights.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+
+    Returns
+    -------
+    dict
+        keys = shard prefixes, values = dicts whose keys are tokens and whose
+        values are delta-encoded lists of row ids (the first id, then the gap
+        to each following one)
+    """
+    postings = collections.defaultdict(list)
+    for i, flight in enumerate(flights):
+        for token in search_tokens(flight):
+            postings[token].append(i)
+
+    shards = collections.defaultdict(dict)
+    for token in sorted(postings):
+        ids = postings[token]
+        shards[token[:prefix_len]][token] = [ids[0]] + [b - a for a, b in zip(ids[:-1], ids[1:])]
+    return dict(shards)
+
+
+def _write_json(path, data):
+    with open(path, mode='w') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def export_search_index(flights, outdir):
+    """Write the sharded search index and row data for search.js.
+
+    outdir/meta.json describes the shards, outdir/idx-{prefix}.json holds
+    the tokens starting with each prefix, and outdir/rows-{n}.json holds the
+    summaries of flights n * rows_per_shard onwards. Row ids are positions in
+    flights, ie the order of the log.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    outdir : str
+        directory to write the files to
+    """
+    os.makedirs(outdir, exist_ok=True)
+    for name in os.listdir(outdir):
+        if name.startswith('idx-') or name.startswith('rows-'):
+            os.remove(os.path.join(outdir, name))
+
+    shards = build_index(flights)
+    for prefix, tokens in shards.items():
+        _write_json(os.path.join(outdir, f'idx-{prefix}.json'), tokens)
+
+    rows = [search_row(flight) for flight in flights]
+    for n, start in enumerate(range(0, len(rows), rows_per_shard)):
+        _write_json(os.path.join(outdir, f'rows-{n}.json'), rows[start:start + rows_per_shard])
+
+    _write_json(os.path.join(outdir, 'meta.json'),
+                {'rows': len(rows),
+                 'rows_per_shard': rows_per_shard,
+                 'prefix_len': prefix_len,
+                 'shards': sorted(shards)})
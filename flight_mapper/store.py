@@ -0,0 +1,282 @@
+import collections
+import datetime
+import sqlite3
+import pandas
+
+from .read_data import Airport, Flight, Registry, parse_flight_line, parse_route_nodes
+
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS airports (
+    code TEXT PRIMARY KEY,
+    iata TEXT,
+    icao TEXT,
+    lat REAL,
+    lon REAL,
+    elevation REAL,
+    name TEXT,
+    city TEXT,
+    region TEXT,
+    country TEXT,
+    continent TEXT
+);
+
+CREATE TABLE IF NOT EXISTS flights (
+    id INTEGER PRIMARY KEY,
+    line TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    mkt_cxr TEXT,
+    adm_cxr TEXT,
+    registration TEXT,
+    manufacturer TEXT,
+    type2 TEXT,
+    type3 TEXT,
+    origin TEXT,
+    destination TEXT,
+    UNIQUE (line, occurrence)
+);
+
+CREATE TABLE IF NOT EXISTS flight_airports (
+    airport TEXT NOT NULL,
+    flight_id INTEGER NOT NULL REFERENCES flights(id) ON DELETE CASCADE,
+    PRIMARY KEY (airport, flight_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS flights_date ON flights(date);
+CREATE INDEX IF NOT EXISTS flights_position ON flights(position);
+CREATE INDEX IF NOT EXISTS flights_mkt_cxr ON flights(mkt_cxr);
+CREATE INDEX IF NOT EXISTS flights_adm_cxr ON flights(adm_cxr);
+CREATE INDEX IF NOT EXISTS flights_registration ON flights(registration);
+CREATE INDEX IF NOT EXISTS flights_type2 ON flights(type2);
+CREATE INDEX IF NOT EXISTS flights_type3 ON flights(type3);
+CREATE INDEX IF NOT EXISTS flights_origin ON flights(origin);
+CREATE INDEX IF NOT EXISTS flights_destination ON flights(destination);
+CREATE INDEX IF NOT EXISTS flight_airports_flight ON flight_airports(flight_id);
+'''
+
+# Version of the flights tables, stored as the database's user_version;
+# flights stored by an older version are dropped and read again
+_schema_version = 2
+
+_airport_columns = ['code', 'iata', 'icao', 'lat', 'lon', 'elevation', 'name',
+                    'city', 'region', 'country', 'continent']
+
+
+def _date_key(date):
+    """Convert a date given as str, date or datetime to the YYYYMMDD form
+    used in the flights list."""
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        return date.strftime('%Y%m%d')
+    return str(date)
+
+
+class FlightStore:
+    def __init__(self, path=':memory:'):
+        """SQLite backed store of airports and flights with indexed queries.
+
+        The store is synchronised with the text files by load_airports and
+        update, which only touch the rows that changed since the last call.
+        Queries return lists of Flight objects in the order of the flights
+        list, so that they can be passed straight to make_html or plot_map.
+
+        Parameters
+        ----------
+        path : str
+            file path of the database, or ':memory:' for a temporary one
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        version, = self.connection.execute('PRAGMA user_version').fetchone()
+        if version != _schema_version:
+            self.connection.executescript('DROP TABLE IF EXISTS flight_airports;\n'
+                                          'DROP TABLE IF EXISTS flights;')
+        self.connection.executescript(_schema)
+        self.connection.execute(f'PRAGMA user_version = {_schema_version}')
+        self._airports = None
+        self._flights = {}
+        self.registry = Registry()
+
+    def close(self):
+        self.connection.close()
+
+    @property
+    def airports(self):
+        """dict of all Airports in the store, keyed by internal code."""
+        if self._airports is None:
+            cursor = self.connection.execute(
+                'SELECT {} FROM airports'.format(', '.join(_airport_columns)))
+            self._airports = {}
+            for row in cursor:
+                airport = Airport(**dict(zip(_airport_columns, row)))
+                self._airports[airport.code] = airport
+        return self._airports
+
+    def load_airports(self, filename):
+        """Insert or replace the airports from the csv database.
+
+        Parameters
+        ----------
+        filename : str
+            file path of airports csv data
+        """
+        df = pandas.read_csv(filename)
+        df = df.fillna('')
+        rows = [tuple(row[col] for col in _airport_columns) for _, row in df.iterrows()]
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO airports ({}) VALUES ({})'.format(
+                    ', '.join(_airport_columns), ', '.join('?' * len(_airport_columns))),
+                rows)
+
+        # Flights hold references to Airport objects, so they must be rebuilt
+        self._airports = None
+        self._flights = {}
+        self.registry = Registry()
+
+    def update(self, filename):
+        """Synchronise the store with the flights list.
+
+        Lines which are new are parsed and inserted, lines which have been
+        removed from the file are deleted, and unchanged lines only have
+        their position updated. A line repeated in the file is a flight for
+        each time it appears, told apart by its occurrence.
+
+        Parameters
+        ----------
+        filename : str
+            file path of flights list
+
+        Returns
+        -------
+        tuple
+            (number of flights added, number of flights removed)
+        """
+        with open(filename, 'r') as f:
+            lines = [row.strip() for row in f.readlines()]
+        lines = [row for row in lines if row != '']
+        positions = {}
+        seen = collections.Counter()
+        for i, line in enumerate(lines):
+            positions[(line, seen[line])] = i
+            seen[line] += 1
+
+        existing = {(line, occurrence): i for line, occurrence, i in
+                    self.connection.execute('SELECT line, occurrence, id FROM flights')}
+        removed = [existing[key] for key in existing if key not in positions]
+        added = [key for key in positions if key not in existing]
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM flights WHERE id = ?',
+                                        [(i,) for i in removed])
+            self.connection.executemany('UPDATE flights SET position = ? WHERE id = ?',
+                                        [(positions[key], i) for key, i in existing.items()
+                                         if key in positions])
+            for key in added:
+                self._insert(key, positions[key])
+
+        for i in removed:
+            flight = self._flights.pop(i, None)
+            if flight is not None:
+                for shared in (flight.carrier, flight.operator, flight.aircraft):
+                    if shared is not None:
+                        shared.flights.remove(flight)
+
+        return len(added), len(removed)
+
+    def _insert(self, key, position):
+        line, occurrence = key
+        data = parse_flight_line(line)
+        codes = [code for code, airport_type in parse_route_nodes(data['route'])
+                 if airport_type != 'scheduled']
+
+        cursor = self.connection.execute(
+            '''INSERT INTO flights (line, occurrence, position, date, mkt_cxr, adm_cxr,
+                                    registration, manufacturer, type2, type3, origin,
+                                    destination)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (line, occurrence, position, data['date'], data.get('mkt_cxr'), data.get('adm_cxr'),
+             data.get('registration'), data.get('manufacturer'), data.get('type2'),
+             data.get('type3'), codes[0], codes[-1]))
+
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO flight_airports (airport, flight_id) VALUES (?, ?)',
+            [(code, cursor.lastrowid) for code in codes])
+
+    def query(self,
+              start=None,
+              end=None,
+              carrier=None,
+              airport=None,
+              origin=None,
+              destination=None,
+              registration=None,
+              aircraft=None):
+        """Find the flights matching all of the given filters.
+
+        Parameters
+        ----------
+        start : str or datetime
+            first date to include, inclusive
+        end : str or datetime
+            last date to include, inclusive
+        carrier : str
+            marketing or operating carrier name
+        airport : str
+            internal code of any airport landed at or departed from
+        origin : str
+            internal code of the first airport
+        destination : str
+            internal code of the final airport
+        registration : str
+            airplane registration
+        aircraft : str
+            airplane type, matched against type2 and type3
+
+        Returns
+        -------
+        list
+            list of Flights, in the order of the flights list
+        """
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(_date_key(start))
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(_date_key(end))
+        if carrier is not None:
+            clauses.append('(mkt_cxr = ? OR adm_cxr = ?)')
+            params += [carrier, carrier]
+        if airport is not None:
+            clauses.append('id IN (SELECT flight_id FROM flight_airports WHERE airport = ?)')
+            params.append(airport)
+        if origin is not None:
+            clauses.append('origin = ?')
+            params.append(origin)
+        if destination is not None:
+            clauses.append('destination = ?')
+            params.append(destination)
+        if registration is not None:
+            clauses.append('registration = ?')
+            params.append(registration)
+        if aircraft is not None:
+            clauses.append('(type2 = ? OR type3 = ?)')
+            params += [aircraft, aircraft]
+
+        sql = 'SELECT id, line FROM flights'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY position'
+
+        flights = []
+        for i, line in self.connection.execute(sql, params):
+            if i not in self._flights:
+                self._flights[i] = Flight(self.airports, registry=self.registry,
+                                          **parse_flight_line(line))
+            flights.append(self._flights[i])
+
+        return flights
@@ -0,0 +1,259 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import numpy as np
+
+from .geojson import collapse_legs, great_circle_points, split_antimeridian
+
+
+tile_size = 256
+max_latitude = 85.0511287798
+
+# Area of the airport markers in points^2, as given to scatter, and width of
+# the route lines and marker edges in points
+marker_size = 20
+line_width = 1
+
+# Extra space around each line or point, in pixels, when deciding which
+# tiles it touches, so that line widths and markers crossing a tile edge are
+# drawn on both tiles: the radius of a marker plus a line width. Tiles are
+# one inch across, so a point is tile_size / 72 pixels.
+_margin = (np.sqrt(marker_size) / 2 + line_width) * tile_size / 72
+
+
+def lonlat_to_world(points):
+    """Project (lon, lat) in degrees to web Mercator coordinates in [0, 1].
+
+    Parameters
+    ----------
+    points : np.ndarray
+        array of shape (n, 2) of (lon, lat)
+
+    Returns
+    -------
+    np.ndarray
+        array of shape (n, 2) of (x, y), with y increasing southwards
+    """
+    lons = points[:, 0]
+    lats = np.radians(np.clip(points[:, 1], -max_latitude, max_latitude))
+    x = (lons + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lats) + 1.0 / np.cos(lats)) / np.pi) / 2.0
+    return np.column_stack((x, y))
+
+
+def feature_geometries(flights):
+    """The routes and airports to draw, in world coordinates.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+
+    Returns
+    -------
+    dict
+        keys = 'route:ABC-DEF' or 'airport:ABC', values = list of arrays of
+        (x, y); a route has one array per antimeridian-split part and an
+        airport a single array of one point
+    """
+    geometries = {}
+    for (airport1, airport2), count in collapse_legs(flights):
+        parts = split_antimeridian(great_circle_points(airport1, airport2, step=0.25))
+        geometries[f'route:{airport1.code}-{airport2.code}'] = [lonlat_to_world(p) for p in parts]
+
+        for airport in (airport1, airport2):
+            geometries[f'airport:{airport.code}'] = [lonlat_to_world(np.array([[airport.lon, airport.lat]]))]
+
+    return geometries
+
+
+def geometry_digest(parts):
+    """Fingerprint of the coordinates of a line or point, so that a route or
+    airport which moved is drawn again."""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(np.round(part, 10).tobytes())
+        h.update(b'|')
+    return h.hexdigest()[:16]
+
+
+def tiles_for_geometry(parts, zoom):
+    """Find the tiles at one zoom level which a line or point touches.
+
+    Parameters
+    ----------
+    parts : list
+        list of arrays of (x, y) in world coordinates
+    zoom : int
+
+    Returns
+    -------
+    set
+        set of (x, y) tile indices
+    """
+    n = 2 ** zoom
+    margin = _margin / tile_size
+    tiles = set()
+    for part in parts:
+        part = part * n
+        # Resample each segment at half a tile so none is skipped over
+        samples = [part[:1]]
+        for start, end in zip(part[:-1], part[1:]):
+            steps = max(1, int(np.ceil(np.max(np.abs(end - start)) * 2)))
+            t = np.linspace(0.0, 1.0, steps + 1)[1:, None]
+            samples.append(start + t * (end - start))
+        samples = np.vstack(samples)
+
+        for dx in (-margin, margin):
+            for dy in (-margin, margin):
+                xs = np.clip(np.floor(samples[:, 0] + dx), 0, n - 1).astype(int)
+                ys = np.clip(np.floor(samples[:, 1] + dy), 0, n - 1).astype(int)
+                tiles.update(zip(xs.tolist(), ys.tolist()))
+
+    return tiles
+
+
+def _render_tile(job):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    zoom, x, y, lines, points, path = job
+    n = 2 ** zoom
+
+    fig = plt.figure(figsize=(1, 1), dpi=tile_size)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(x, x + 1)
+    ax.set_ylim(y + 1, y)
+    ax.axis('off')
+
+    if lines:
+        ax.add_collection(LineCollection([line * n for line in lines],
+                                         colors='k', linewidths=line_width, zorder=100))
+    if points:
+        points = np.vstack(points) * n
+        ax.scatter(points[:, 0], points[:, 1], color='k', s=marker_size,
+                   linewidths=line_width, zorder=101)
+        ax.scatter(points[:, 0], points[:, 1], color='white', s=3.25, zorder=102)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path, dpi=tile_size, transparent=True)
+    plt.close(fig)
+    return path
+
+
+def render_tiles(flights, outdir, zooms=range(8), processes=None):
+    """Render the routes and airports as a pyramid of web Mercator tiles.
+
+    Tiles are written to outdir/{z}/{x}/{y}.png with transparent
+    backgrounds, to be layered over a basemap. A fingerprint of each route
+    and airport and the tiles it touches are recorded in outdir/tiles.json,
+    and on the next build only the tiles touched by routes or airports which
+    were added, removed or moved since are rendered again, along with every
+    tile of a zoom level not built before. Tiles of zoom levels no longer
+    built are removed.
+
+    Parameters
+    ----------
+    flights : list
+        list of Flights
+    outdir : str
+        top directory of the tile pyramid
+    zooms : iterable
+        zoom levels to render
+    processes : int
+        number of worker processes, defaults to the number of CPUs; 1 renders
+        the tiles in this process
+
+    Returns
+    -------
+    dict
+        keys = 'written', 'removed', values = lists of tile file paths
+    """
+    zooms = list(zooms)
+    index_path = os.path.join(outdir, 'tiles.json')
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    old_zooms = index.get('zooms', [])
+    old_features = {key: feature for key, feature in index.get('features', {}).items()
+                    if isinstance(feature, dict)}
+    new_zooms = [zoom for zoom in zooms if zoom not in old_zooms]
+    tile_zoom = lambda tile: int(tile.split('/')[0])
+
+    geometries = feature_geometries(flights)
+
+    features = {}
+    tile_contents = {}
+    dirty = set()
+    for key, parts in geometries.items():
+        digest = geometry_digest(parts)
+        old = old_features.get(key)
+        if old is not None and old['digest'] == digest:
+            touched = [tile for tile in old['tiles'] if tile_zoom(tile) in zooms]
+            build = new_zooms
+        else:
+            touched = []
+            build = zooms
+            if old is not None:
+                dirty.update(tile for tile in old['tiles'] if tile_zoom(tile) in zooms)
+        for zoom in build:
+            tiles = [f'{zoom}/{x}/{y}' for x, y in sorted(tiles_for_geometry(parts, zoom))]
+            touched += tiles
+            dirty.update(tiles)
+        features[key] = {'digest': digest, 'tiles': touched}
+        for tile in touched:
+            tile_contents.setdefault(tile, []).append(key)
+
+    for key, old in old_features.items():
+        if key not in features:
+            dirty.update(tile for tile in old['tiles'] if tile_zoom(tile) in zooms)
+
+    removed = []
+    for zoom in old_zooms:
+        zoom_dir = os.path.join(outdir, str(zoom))
+        if zoom not in zooms and os.path.isdir(zoom_dir):
+            for dirpath, _, filenames in os.walk(zoom_dir):
+                removed += [os.path.join(dirpath, filename) for filename in filenames]
+            shutil.rmtree(zoom_dir)
+
+    jobs = []
+    for tile in sorted(dirty):
+        path = os.path.join(outdir, tile + '.png')
+        if tile not in tile_contents:
+            if os.path.exists(path):
+                os.remove(path)
+            removed.append(path)
+            continue
+
+        zoom, x, y = [int(i) for i in tile.split('/')]
+        lines = []
+        points = []
+        for key in tile_contents[tile]:
+            if key.startswith('route:'):
+                lines += geometries[key]
+            else:
+                points += geometries[key]
+        jobs.append((zoom, x, y, lines, points, path))
+
+    written = []
+    if processes == 1:
+        written = [_render_tile(job) for job in jobs]
+    elif jobs:
+        # The build runs this in a thread alongside others, where forking
+        # can deadlock, so the workers are spawned
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            for path in pool.imap_unordered(_render_tile, jobs, chunksize=16):
+                written.append(path)
+
+    os.makedirs(outdir, exist_ok=True)
+    with open(index_path, mode='w') as f:
+        json.dump({'zooms': zooms, 'features': features}, f, separators=(',', ':'))
+
+    return {'written': written, 'removed': removed}
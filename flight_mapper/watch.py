@@ -0,0 +1,216 @@
+import functools
+import http.server
+import os
+import threading
+import time
+
+from .build import map_views, site_graph
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+# Tasks which only depend on the routes and airports, and so can be skipped,
+# keeping their last results, when an edit to the flights list leaves every
+# route unchanged
+route_tasks = ['map_' + view for view in map_views] + ['geojson', 'tiles', 'network']
+
+
+class Watcher:
+    def __init__(self, paths, interval=0.25):
+        """Wait for changes to files, or to files anywhere under directories.
+
+        inotify is used when the inotify_simple package is installed, and
+        otherwise the modification times are polled.
+
+        Parameters
+        ----------
+        paths : list
+            files and directories to watch
+        interval : float
+            seconds between polls, and the time allowed for a burst of
+            events (eg an editor saving a file) to settle
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.interval = interval
+        self.inotify = None
+
+        if inotify_simple is not None:
+            flags = inotify_simple.flags
+            mask = flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM
+            self.inotify = inotify_simple.INotify()
+            self.dirs = {}
+            for directory in self._directories():
+                self.dirs[self.inotify.add_watch(directory, mask)] = directory
+        else:
+            self.snapshot = self._scan()
+
+    def _directories(self):
+        dirs = set()
+        for path in self.paths:
+            if os.path.isdir(path):
+                for dirpath, _, _ in os.walk(path):
+                    dirs.add(dirpath)
+            else:
+                # Watch the parent, as editors often replace files by renaming
+                dirs.add(os.path.dirname(path))
+        return sorted(dirs)
+
+    def _scan(self):
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    for filename in filenames:
+                        full = os.path.join(dirpath, filename)
+                        st = os.stat(full)
+                        snapshot[full] = (st.st_mtime_ns, st.st_size)
+            elif os.path.exists(path):
+                st = os.stat(path)
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _watched(self, path):
+        return any(path == p or path.startswith(p + os.sep) for p in self.paths)
+
+    def wait(self):
+        """Block until something changes.
+
+        Returns
+        -------
+        set
+            absolute paths of the files which changed
+        """
+        if self.inotify is not None:
+            changed = set()
+            # Events in watched directories may all be for files which are
+            # not watched themselves, so keep reading until one is
+            while not changed:
+                events = self.inotify.read()
+                while events:
+                    for event in events:
+                        path = os.path.join(self.dirs[event.wd], event.name)
+                        if self._watched(path):
+                            changed.add(path)
+                    events = self.inotify.read(timeout=int(self.interval * 1000))
+            return changed
+
+        while True:
+            time.sleep(self.interval)
+            snapshot = self._scan()
+            changed = {path for path in set(snapshot) | set(self.snapshot)
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+
+
+def route_signature(flights):
+    """Everything about the flights which is drawn on the maps."""
+    return [tuple((leg[0].code, leg[0].lat, leg[0].lon, leg[0].iata,
+                   leg[1].code, leg[1].lat, leg[1].lon, leg[1].iata) for leg in flight.route)
+            for flight in flights]
+
+
+def affected_tasks(graph, changed):
+    """Names of the tasks which read any of the changed files, and all the
+    tasks downstream of them."""
+    affected = set()
+    for name, task in graph.tasks.items():
+        for path in task.inputs:
+            path = os.path.abspath(path)
+            if any(c == path or c.startswith(path + os.sep) for c in changed):
+                affected.add(name)
+
+    grew = True
+    while grew:
+        grew = False
+        for name, task in graph.tasks.items():
+            if name not in affected and affected.intersection(task.deps):
+                affected.add(name)
+                grew = True
+
+    return affected
+
+
+def serve(outdir, port=8000):
+    """Serve outdir over HTTP from a background thread.
+
+    Returns
+    -------
+    http.server.ThreadingHTTPServer
+    """
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=outdir)
+    server = http.server.ThreadingHTTPServer(('localhost', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(flights_file='flights.txt',
+          airports_file='data/airports.csv',
+          outdir='public',
+          root='.',
+          jobs=None,
+          port=8000):
+    """Build the site, serve it, and rebuild the affected parts on changes.
+
+    The parsed airports and flights are kept between rebuilds. When the
+    flights list changes but no route does, only the HTML is rebuilt and
+    the maps, GeoJSON and tiles are left as they are.
+
+    Parameters
+    ----------
+    flights_file : str
+        file path of flights list
+    airports_file : str
+        file path of airports csv data
+    outdir : str
+        directory the site is written to
+    root : str
+        directory holding the static assets and pictures
+    jobs : int
+        maximum number of tasks and worker processes running at once
+    port : int
+        port of the preview server, or None for no server
+    """
+    graph = site_graph(flights_file, airports_file, outdir, root, processes=jobs)
+    try:
+        results = graph.run(jobs=jobs)
+        print(graph.summary())
+    except Exception as e:
+        print(f'Build failed: {e!r}')
+        results = {}
+
+    if port is not None:
+        serve(outdir, port)
+        print(f'Serving {outdir} at http://localhost:{port}/')
+
+    inputs = sorted({path for task in graph.tasks.values() for path in task.inputs})
+    watcher = Watcher(inputs)
+    while True:
+        changed = watcher.wait()
+        start = time.perf_counter()
+
+        affected = affected_tasks(graph, changed)
+        if not affected:
+            continue
+
+        known = {name: result for name, result in results.items() if name not in affected}
+        try:
+            if changed == {os.path.abspath(flights_file)}:
+                known = graph.run(jobs=jobs, targets=['flights'], results=known)
+                if 'flights' in results and \
+                        route_signature(known['flights']) == route_signature(results['flights']):
+                    affected -= set(route_tasks)
+                    known.update({name: results[name] for name in route_tasks if name in results})
+
+            results = graph.run(jobs=jobs, targets=sorted(affected), results=known)
+        except Exception as e:
+            print(f'Build failed: {e!r}')
+            continue
+
+        print('Rebuilt {} in {:.2f} s'.format(', '.join(sorted(affected - {'airports', 'flights'})),
+                                               time.perf_counter() - start))
@@ -0,0 +1,96 @@
+// Search the flight log using the index written by
+// flight_mapper.search.export_search_index. Only the index shards for the
+// words typed, and the row shards for the flights shown, are downloaded.
+
+var searchRoot = 'search/';
+var searchLimit = 50;
+var searchCache = {};
+
+function searchFetch(name) {
+    if (!(name in searchCache)) {
+        searchCache[name] = fetch(searchRoot + name).then(function (response) {
+            return response.ok ? response.json() : {};
+        });
+    }
+    return searchCache[name];
+}
+
+function searchWords(query) {
+    return query.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase()
+                .split(/[^a-z0-9]+/).filter(function (word) { return word.length > 0; });
+}
+
+// Row ids of all tokens in a shard starting with word
+function searchPrefix(word, meta) {
+    var prefix = word.slice(0, meta.prefix_len);
+    if (meta.shards.indexOf(prefix) < 0) {
+        return Promise.resolve(new Set());
+    }
+    return searchFetch('idx-' + prefix + '.json').then(function (shard) {
+        var ids = new Set();
+        for (var token in shard) {
+            if (token.startsWith(word)) {
+                var id = 0;
+                shard[token].forEach(function (delta, n) {
+                    id = n == 0 ? delta : id + delta;
+                    ids.add(id);
+                });
+            }
+        }
+        return ids;
+    });
+}
+
+function searchRun(query) {
+    return searchFetch('meta.json').then(function (meta) {
+        // Words shorter than a shard prefix, eg a letter still being typed,
+        // cannot be looked up, and are left out rather than matching nothing
+        var words = searchWords(query).filter(function (word) {
+            return word.length >= meta.prefix_len;
+        });
+        if (words.length == 0) {
+            return [];
+        }
+        return Promise.all(words.map(function (word) { return searchPrefix(word, meta); }))
+            .then(function (sets) {
+                var ids = Array.from(sets[0]).filter(function (id) {
+                    return sets.every(function (set) { return set.has(id); });
+                });
+                ids.sort(function (a, b) { return a - b; });
+                ids = ids.slice(0, searchLimit);
+                return Promise.all(ids.map(function (id) {
+                    var n = Math.floor(id / meta.rows_per_shard);
+                    return searchFetch('rows-' + n + '.json').then(function (rows) {
+                        return rows[id % meta.rows_per_shard];
+                    });
+                }));
+            });
+    });
+}
+
+function searchShow(rows, table) {
+    table.textContent = '';
+    rows.forEach(function (row) {
+        var tr = document.createElement('tr');
+        row.forEach(function (value) {
+            var td = document.createElement('td');
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+        table.appendChild(tr);
+    });
+}
+
+document.addEventListener('input', function (event) {
+    if (event.target.id != 'search-box') {
+        return;
+    }
+    var query = event.target.value;
+    var table = document.getElementById('search-results');
+    searchRun(query).then(function (rows) {
+        // Ignore results for a query which has since been typed over
+        if (document.getElementById('search-box').value == query) {
+            searchShow(rows, table);
+        }
+    });
+});
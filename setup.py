@@ -6,9 +6,14 @@ setup(
     include_package_data=True,
     install_requires=[
         'matplotlib>=3.2',
+        'Pillow',
         'numpy>=1.17',
         'scipy>=1.3',
         'pandas',
         'yattag'
-    ]
+    ],
+    extras_require={
+        'watch': ['inotify_simple'],
+        'arrow': ['pyarrow']
+    }
 )
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+import shapefile
+
+from flight_mapper.geometry import feature_scale, features, views, view_features
+from flight_mapper.read_data import Flight, Registry, parse_flight_line, read_airports
+
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def airports():
+    return read_airports(os.path.join(repo, 'data', 'airports.csv'))
+
+
+@pytest.fixture
+def make_flights(airports):
+    """Parse lines of a flights list into Flights sharing one Registry."""
+    default_airports = airports
+
+    def make(*lines, registry=None, airports=None):
+        if registry is None:
+            registry = Registry()
+        if airports is None:
+            airports = default_airports
+        return [Flight(airports, registry=registry, **parse_flight_line(line)) for line in lines]
+    return make
+
+
+@pytest.fixture(scope='session')
+def shapefiles(tmp_path_factory):
+    """Directory of small stand-ins for every Natural Earth shapefile the
+    views read, see geometry.build_geometry."""
+    directory = str(tmp_path_factory.mktemp('natural_earth'))
+    for view in views:
+        for feature in view_features(view):
+            name = f'ne_{feature_scale(view, feature)}_{features[feature]["name"]}'
+            if feature in ('land', 'ocean', 'lakes'):
+                writer = shapefile.Writer(os.path.join(directory, name), shapeType=shapefile.POLYGON)
+                writer.poly([[[-20.0, 40.0], [-20.0, 60.0], [20.0, 60.0], [20.0, 40.0], [-20.0, 40.0]]])
+            else:
+                writer = shapefile.Writer(os.path.join(directory, name), shapeType=shapefile.POLYLINE)
+                writer.line([[[-100.0, 30.0], [-100.0, 49.0]], [[-10.0, 50.0], [10.0, 50.0]]])
+            writer.field('name', 'C')
+            writer.record(name)
+            writer.close()
+    return directory
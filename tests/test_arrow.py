@@ -0,0 +1,70 @@
+import datetime
+
+import pytest
+
+from flight_mapper import arrow
+from flight_mapper.arrow import export_arrow
+from flight_mapper.read_data import gc_distance
+
+pyarrow = pytest.importorskip('pyarrow')
+import pyarrow.ipc
+import pyarrow.parquet
+
+
+lines = [
+    'date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,type2=A320,'
+    'registration=EI-DVN,msn=4715,num_engines=2,cabin=Y',
+    'date=20220617,desig=FR,mkt_cxr=Ryanair,number=667,route=BHX-sDUB-dLHR-LGW,type2=737-800,'
+    'registration=EI-ENX',
+]
+
+
+def read_tables(paths, file_format):
+    tables = {}
+    for path in paths:
+        name = path.rsplit('/', 1)[-1].split('.')[0]
+        if file_format == 'parquet':
+            tables[name] = pyarrow.parquet.read_table(path)
+        else:
+            with pyarrow.ipc.open_file(pyarrow.memory_map(path)) as reader:
+                tables[name] = reader.read_all()
+    return {name: table.to_pylist() for name, table in tables.items()}
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_export_round_trip(tmp_path, airports, make_flights, file_format):
+    flights = make_flights(*lines)
+    some_airports = {code: airports[code] for code in ['DUB', 'LHR', 'BHX', 'LGW']}
+    tables = read_tables(export_arrow(flights, some_airports, str(tmp_path), file_format),
+                         file_format)
+
+    first, second = tables['flights']
+    assert first['date'] == datetime.date(2022, 6, 18)
+    assert (first['mkt_cxr'], first['registration'], first['msn']) == ('Aer Lingus', 'EI-DVN', '4715')
+    assert first['num_engines'] == 2 and first['adm_cxr'] is None
+    assert (second['origin'], second['destination']) == ('BHX', 'LGW')
+    assert second['distance'] == pytest.approx(flights[1].distance)
+
+    legs = [(leg['flight_id'], leg['origin'], leg['destination'], leg['scheduled'], leg['diverted'])
+            for leg in tables['legs']]
+    assert legs == [(0, 'DUB', 'LHR', False, False),
+                    (1, 'BHX', 'LHR', True, True),
+                    (1, 'LHR', 'LGW', False, False)]
+    assert tables['legs'][1]['distance'] == pytest.approx(gc_distance(airports['BHX'], airports['LHR']))
+
+    assert sorted(row['code'] for row in tables['airports']) == ['BHX', 'DUB', 'LGW', 'LHR']
+
+
+def test_export_in_batches(tmp_path, airports, make_flights, monkeypatch):
+    monkeypatch.setattr(arrow, 'batch_size', 2)
+    flights = make_flights(*(lines * 3))
+    paths = export_arrow(flights, {}, str(tmp_path), 'arrow')
+    tables = read_tables(paths, 'arrow')
+    assert [row['id'] for row in tables['flights']] == list(range(6))
+    assert [row['mkt_cxr'] for row in tables['flights']] == ['Aer Lingus', 'Ryanair'] * 3
+    assert tables['airports'] == []
+
+
+def test_export_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        export_arrow([], {}, str(tmp_path), 'csv')
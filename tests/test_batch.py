@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from flight_mapper.batch import batch_build, batch_users
+
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_batch_users_are_named_after_their_lists():
+    users = batch_users(['logs/alice/flights.txt', 'logs/bob.txt'])
+    assert users == {'alice': 'logs/alice/flights.txt', 'bob': 'logs/bob.txt'}
+
+
+def test_batch_users_must_be_unique():
+    with pytest.raises(ValueError, match='alice'):
+        batch_users(['logs/alice/flights.txt', 'other/alice.txt'])
+
+
+def test_failed_site_does_not_stop_the_others(tmp_path, monkeypatch, shapefiles):
+    from flight_mapper.geometry import warm_cache
+
+    monkeypatch.chdir(tmp_path)
+    # The batch warms the default cache, so fill it from the local shapefiles
+    warm_cache(shapefile_dir=shapefiles)
+
+    good = tmp_path / 'good.txt'
+    good.write_text('date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,'
+                    'type2=A320,type3=A320-200,manufacturer=Airbus,registration=EI-DVN\n')
+    bad = tmp_path / 'bad.txt'
+    bad.write_text('date=20220618,route=DUB-XXX\n')
+
+    errors = batch_build(batch_users([str(good), str(bad)]),
+                         airports_file=os.path.join(repo, 'data', 'airports.csv'),
+                         outdir='public', root=repo, processes=1)
+
+    assert errors['good'] is None
+    assert 'Traceback' in errors['bad']
+    assert os.path.isfile(os.path.join('public', 'good', 'index.html'))
+    assert not os.path.exists(os.path.join('public', 'bad', 'index.html'))
@@ -0,0 +1,140 @@
+import functools
+import operator
+import time
+
+import pytest
+
+from flight_mapper.build import Task, TaskGraph
+
+
+def add(*values):
+    return sum(values)
+
+
+def test_order_puts_deps_first():
+    graph = TaskGraph([Task('c', add, deps=('a', 'b')),
+                       Task('b', add, deps=('a',)),
+                       Task('a', add, args=(1,))])
+    order = graph.order()
+    assert sorted(order) == ['a', 'b', 'c']
+    assert order.index('a') < order.index('b') < order.index('c')
+
+
+def test_order_of_targets_only_includes_their_deps():
+    graph = TaskGraph([Task('a', add), Task('b', add, deps=('a',)), Task('c', add)])
+    assert graph.order(['b']) == ['a', 'b']
+
+
+def test_order_detects_cycles():
+    graph = TaskGraph([Task('a', add, deps=('c',)),
+                       Task('b', add, deps=('a',)),
+                       Task('c', add, deps=('b',))])
+    with pytest.raises(ValueError, match='Dependency cycle: a -> c -> b -> a'):
+        graph.order()
+
+
+def test_order_rejects_unknown_deps():
+    graph = TaskGraph([Task('a', add, deps=('missing',))])
+    with pytest.raises(KeyError):
+        graph.order()
+
+
+def test_add_rejects_duplicate_names():
+    graph = TaskGraph([Task('a', add)])
+    with pytest.raises(ValueError):
+        graph.add(Task('a', add))
+
+
+def test_run_passes_dep_results_then_args():
+    graph = TaskGraph([Task('a', add, args=(1,)),
+                       Task('b', add, args=(10,), deps=('a',)),
+                       Task('c', add, args=(100,), deps=('a', 'b'))])
+    results = graph.run(jobs=2, processes=False)
+    assert results == {'a': 1, 'b': 11, 'c': 112}
+
+
+def test_run_skips_known_results_and_other_targets():
+    calls = []
+
+    def record(*values):
+        calls.append(values)
+        return sum(values)
+
+    graph = TaskGraph([Task('a', record, args=(1,)),
+                       Task('b', record, args=(10,), deps=('a',)),
+                       Task('c', record, args=(100,))])
+    results = graph.run(jobs=2, targets=['b'], results={'a': 5}, processes=False)
+    assert results == {'a': 5, 'b': 15}
+    assert calls == [(5, 10)]
+
+
+def test_run_raises_task_errors():
+    def fail():
+        raise RuntimeError('broken')
+
+    graph = TaskGraph([Task('a', fail), Task('b', add, deps=('a',))])
+    with pytest.raises(RuntimeError, match='broken'):
+        graph.run(jobs=2, processes=False)
+
+
+def test_run_skips_dependents_of_failed_tasks_only():
+    def fail(*values):
+        raise RuntimeError('broken')
+
+    graph = TaskGraph([Task('a', add, args=(1,)),
+                       Task('bad', fail, deps=('a',)),
+                       Task('after', add, deps=('bad',)),
+                       Task('later', add, deps=('after',)),
+                       Task('other', add, args=(2,), deps=('a',))])
+    with pytest.raises(RuntimeError, match='broken'):
+        graph.run(jobs=1, processes=False)
+    assert list(graph.failed) == ['bad']
+    assert graph.skipped == ['after', 'later']
+    assert 'other' in graph.timings
+    assert 'bad' in graph.summary() and 'skipped: after, later' in graph.summary()
+
+
+def test_run_counts_slots_against_jobs():
+    running = []
+    peak = []
+
+    def work():
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.02)
+        running.pop()
+
+    graph = TaskGraph([Task('a', work), Task('b', work),
+                       Task('pool', work, slots=2), Task('c', work)])
+    graph.run(jobs=2, processes=False)
+    starts = {name: start for name, (start, end) in graph.timings.items()}
+    ends = {name: end for name, (start, end) in graph.timings.items()}
+    for name in ['a', 'b', 'c']:
+        assert ends[name] <= starts['pool'] or starts[name] >= ends['pool']
+    assert max(peak) <= 2
+
+
+def test_run_starts_small_tasks_while_a_large_one_waits():
+    graph = TaskGraph([Task('a', time.sleep, args=(0.05,)),
+                       Task('pool', time.sleep, args=(0.0,), slots=2),
+                       Task('b', time.sleep, args=(0.0,))])
+    graph.run(jobs=2, processes=False)
+    assert graph.timings['b'][0] < graph.timings['a'][1] <= graph.timings['pool'][0]
+
+
+def test_run_process_tasks():
+    graph = TaskGraph([Task('a', operator.add, args=(1, 2), process=True),
+                       Task('b', operator.mul, args=(4,), deps=('a',), process=True)])
+    assert graph.run(jobs=2) == {'a': 3, 'b': 12}
+
+
+def test_critical_path_follows_the_slowest_chain():
+    def pause(*values, seconds=0.0):
+        time.sleep(seconds)
+
+    graph = TaskGraph([Task('a', pause),
+                       Task('slow', functools.partial(pause, seconds=0.05), deps=('a',)),
+                       Task('fast', pause, deps=('a',)),
+                       Task('end', pause, deps=('slow', 'fast'))])
+    graph.run(jobs=2, processes=False)
+    assert [name for name, seconds in graph.critical_path()] == ['a', 'slow', 'end']
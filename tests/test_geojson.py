@@ -0,0 +1,35 @@
+import numpy as np
+
+from flight_mapper.geojson import simplify, split_antimeridian
+
+
+def test_split_antimeridian_leaves_other_lines_whole():
+    points = np.array([[170.0, 10.0], [175.0, 12.0], [179.0, 14.0]])
+    parts = split_antimeridian(points)
+    assert len(parts) == 1
+    np.testing.assert_array_equal(parts[0], points)
+
+
+def test_split_antimeridian_meets_at_the_crossing():
+    points = np.array([[170.0, 0.0], [-170.0, 10.0]])
+    first, second = split_antimeridian(points)
+    np.testing.assert_allclose(first, [[170.0, 0.0], [180.0, 5.0]])
+    np.testing.assert_allclose(second, [[-180.0, 5.0], [-170.0, 10.0]])
+
+
+def test_split_antimeridian_westwards():
+    points = np.array([[-175.0, 0.0], [-179.0, 0.0], [177.0, 0.0], [175.0, 0.0]])
+    parts = split_antimeridian(points)
+    assert len(parts) == 2
+    assert parts[0][-1, 0] == -180.0 and parts[1][0, 0] == 180.0
+    assert all(np.all(np.abs(np.diff(part[:, 0])) <= 180) for part in parts)
+
+
+def test_simplify_keeps_ends_and_corners():
+    points = np.array([[0.0, 0.0], [1.0, 0.01], [2.0, 0.0], [2.0, 1.0], [2.0, 2.0]])
+    np.testing.assert_array_equal(simplify(points, 0.1), [[0.0, 0.0], [2.0, 0.0], [2.0, 2.0]])
+
+
+def test_simplify_short_lines_unchanged():
+    points = np.array([[0.0, 0.0], [1.0, 1.0]])
+    assert simplify(points, 10.0) is points
@@ -0,0 +1,52 @@
+import os
+import urllib.error
+
+import pytest
+
+from flight_mapper import geometry
+from flight_mapper.geometry import (cache_path, feature_scale, features, load_geometry, views,
+                                    view_features, warm_cache)
+
+
+def test_views_read_their_own_scale():
+    assert feature_scale('earth', 'land') == '110m'
+    assert feature_scale('europe', 'land') == '50m'
+    assert feature_scale('america', 'land') == '50m'
+    assert feature_scale('america', 'states') == '110m'
+    assert 'states' in view_features('america') and 'states' not in view_features('europe')
+
+
+def test_cache_path_fingerprints_view_and_feature(tmp_path):
+    paths = {cache_path(view, feature, str(tmp_path)) for view in views for feature in features}
+    assert len(paths) == len(views) * len(features)
+    assert cache_path('europe', 'land', str(tmp_path)) == cache_path('europe', 'land', str(tmp_path))
+    assert os.path.basename(cache_path('europe', 'land')).startswith('europe-land-')
+
+
+def test_warm_cache_from_local_shapefiles(tmp_path, monkeypatch, shapefiles):
+    def download(*args, **kwargs):
+        raise AssertionError('shapefiles should not be downloaded')
+
+    import cartopy.io.shapereader
+    monkeypatch.setattr(cartopy.io.shapereader, 'natural_earth', download)
+    cache_dir = str(tmp_path / 'cache')
+    warm_cache(cache_dir, shapefile_dir=shapefiles)
+
+    expected = {os.path.basename(cache_path(view, feature, cache_dir))
+                for view in views for feature in view_features(view)}
+    assert set(os.listdir(cache_dir)) == expected
+    # Read back from the files rather than this process's memo
+    geometry._loaded.clear()
+    assert len(load_geometry('europe', 'land', cache_dir)) == 1
+
+
+def test_missing_geometry_gives_a_clear_error(tmp_path, monkeypatch):
+    def offline(*args, **kwargs):
+        raise urllib.error.URLError('no network')
+
+    import cartopy.io.shapereader
+    monkeypatch.setattr(cartopy.io.shapereader, 'natural_earth', offline)
+    with pytest.raises(RuntimeError, match='Natural Earth 50m physical land shapefile'):
+        load_geometry('europe', 'land', str(tmp_path))
+    with pytest.raises(RuntimeError, match='--shapefiles'):
+        load_geometry('europe', 'land', str(tmp_path), shapefile_dir=str(tmp_path))
@@ -0,0 +1,52 @@
+import re
+
+from flight_mapper.html import LogTable, make_html
+from flight_mapper.network import RouteNetwork
+
+
+lines = [
+    'date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,type2=A320,'
+    'type3=A320-200,manufacturer=Airbus,registration=EI-DVN,seat=17F',
+    'date=20220617,desig=FR,mkt_cxr=Ryanair,number=667,route=BHX-DUB,type2=737-800,'
+    'type3=737-800,manufacturer=Boeing,registration=EI-ENX,seat=9A',
+    'date=20220616,desig=AA,mkt_cxr=American Airlines,adm_cxr=Envoy Air,number=3599,'
+    'route=DFW-XNA,type2=E175,type3=E175LR,manufacturer=Embraer,registration=N201NN',
+]
+
+
+def test_page_has_no_inline_handlers_or_whitespace(airports, make_flights):
+    flights = make_flights(*lines)
+    page = make_html(flights, airports, RouteNetwork(flights))
+    assert not re.search(r' on[a-z]+=', page)
+    assert 'jquery' not in page
+    assert '\n' not in page and '>  <' not in page
+    assert '<script src="toggle.js"></script>' in page
+
+
+def test_clickable_elements_name_existing_targets(airports, make_flights):
+    flights = make_flights(*lines)
+    page = make_html(flights, airports, RouteNetwork(flights))
+    ids = set(re.findall(r' id="([^"]+)"', page))
+    sections = re.findall(r'data-section="([^"]+)"', page)
+    assert sections and set(sections) <= ids
+
+    rows = re.findall(r'data-row="([^"]+)"', page)
+    assert len(rows) == len(flights) and set(rows) <= ids
+
+    # data-expand="n" opens the n rows after it
+    trs = re.findall(r'<tr[^>]*>', page)
+    expands = [(i, int(m.group(1))) for i, tr in enumerate(trs)
+               for m in [re.search(r'data-expand="(\d+)"', tr)] if m]
+    assert expands
+    for i, n in expands:
+        assert all('subrow' in tr for tr in trs[i + 1:i + 1 + n])
+
+
+def test_log_details_rows_follow_their_flights(airports, make_flights):
+    table = str(LogTable(make_flights(*lines), airports))
+    rows = re.findall(r'<tr[^>]*>', table)
+    details = [i for i, row in enumerate(rows) if 'details row_closed' in row]
+    assert len(details) == len(lines)
+    # each details row is a sibling directly after its flight's row
+    assert all('details' not in rows[i - 1] for i in details)
+    assert table.count('<tr') == table.count('</tr>')
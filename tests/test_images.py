@@ -0,0 +1,48 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+from yattag import Doc
+
+from flight_mapper.html import write_map_thumb
+from flight_mapper.images import map_sizes, save_figure, variant_name, variant_names
+
+
+def test_variant_names():
+    assert variant_name('earth.png') == 'earth.png'
+    assert variant_name('earth.png', 'thumb', 'webp') == 'earth-thumb.webp'
+    assert variant_name('airports/DUB.png', 'medium') == 'airports/DUB-medium.png'
+    assert variant_names('earth.png') == ['earth.png', 'earth.webp', 'earth-thumb.png',
+                                          'earth-thumb.webp', 'earth-medium.png', 'earth-medium.webp']
+
+
+def test_save_figure_writes_every_size(tmp_path):
+    fig = plt.figure(figsize=(8, 5), dpi=100)
+    path = str(tmp_path / 'earth.png')
+    paths = save_figure(fig, path)
+    plt.close(fig)
+
+    assert sorted(paths) == sorted(str(tmp_path / name) for name in variant_names('earth.png'))
+    full = Image.open(path)
+    assert full.size == (800, 500) and full.format == 'PNG'
+    for size, height in map_sizes.items():
+        for fmt in ('png', 'webp'):
+            image = Image.open(variant_name(path, size, fmt))
+            assert image.format == fmt.upper()
+            assert image.size == (round(800 * height / 500), height)
+
+
+def test_save_figure_never_enlarges(tmp_path):
+    fig = plt.figure(figsize=(3, 3), dpi=100)
+    path = str(tmp_path / 'small.png')
+    save_figure(fig, path)
+    plt.close(fig)
+    assert Image.open(variant_name(path, 'medium')).size == (300, 300)
+
+
+def test_map_thumb_markup():
+    doc, tag, text = Doc().tagtext()
+    write_map_thumb(doc, tag, 'earth.png')
+    html = doc.getvalue()
+    assert 'srcset="earth-thumb.webp 1x, earth-medium.webp 2x"' in html
+    assert 'loading="lazy"' in html and 'href="earth.png"' in html
@@ -0,0 +1,53 @@
+import pytest
+
+from flight_mapper.network import RouteNetwork
+from flight_mapper.read_data import gc_distance
+
+
+routes = ['DUB-LHR', 'LHR-DUB', 'DUB-LHR', 'LHR-KEF', 'KEF-JFK', 'BHX-LGW']
+
+
+@pytest.fixture
+def network(make_flights):
+    return RouteNetwork(make_flights(*(f'date=20220618,mkt_cxr=Aer Lingus,number={i},route={route}'
+                                       for i, route in enumerate(routes))))
+
+
+def codes(airports):
+    return [airport.code for airport in airports]
+
+
+def test_top_routes_count_both_directions(network):
+    (first, count), (second, _) = network.top_routes(2)
+    assert codes(first) == ['DUB', 'LHR'] and count == 3
+    assert codes(second) == ['LHR', 'KEF']
+
+
+def test_degree_and_distances(network):
+    assert dict(zip(codes(network.airports), network.degree())) == {
+        'DUB': 1, 'LHR': 2, 'KEF': 2, 'JFK': 1, 'BHX': 1, 'LGW': 1}
+    dub, lhr = network.airports[:2]
+    assert network.distances[0, 1] == network.distances[1, 0] == pytest.approx(gc_distance(dub, lhr))
+
+
+def test_components_largest_first(network):
+    assert [codes(c) for c in network.components()] == [['DUB', 'LHR', 'KEF', 'JFK'], ['BHX', 'LGW']]
+
+
+def test_hubs(network):
+    assert sorted(codes(airport for airport, degree, closeness in network.hubs(2))) == ['KEF', 'LHR']
+    airport, degree, closeness = network.hubs(1)[0]
+    assert degree == 2 and closeness == pytest.approx(3 / 4 * 3 / 5)
+
+
+def test_chain_and_diameter(network):
+    assert codes(network.chain('DUB', 'JFK')) == ['DUB', 'LHR', 'KEF', 'JFK']
+    assert network.chain('DUB', 'LGW') is None
+    with pytest.raises(ValueError):
+        network.chain('DUB', 'CDG')
+    assert sorted(codes(network.diameter())) == ['DUB', 'JFK', 'KEF', 'LHR']
+
+
+def test_empty_network():
+    network = RouteNetwork([])
+    assert network.top_routes() == [] and network.diameter() == [] and network.components() == []
@@ -0,0 +1,89 @@
+import datetime
+import os
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pytest
+
+from flight_mapper import plot, read_data
+from flight_mapper.pages import group_flights, make_pages
+
+
+dub_lhr = ('date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,type2=A320,'
+           'registration=EI-DVN,first_flight=2011,seat=17F')
+lhr_kef = ('date=20220619,desig=FI,mkt_cxr=Icelandair,number=451,route=LHR-KEF,type2=757,'
+           'registration=TF-FIA,seat=2A')
+
+
+@pytest.fixture
+def maps_drawn(monkeypatch):
+    """Stand in for plot_map, recording the flights of each map drawn."""
+    drawn = []
+
+    def plot_map(flights, airports, **kwargs):
+        drawn.append([flight.number for flight in flights])
+        return plt.figure(figsize=(1, 1))
+
+    monkeypatch.setattr(plot, 'plot_map', plot_map)
+    return drawn
+
+
+def names(paths):
+    return sorted(os.path.relpath(path).replace(os.sep, '/').split('/', 1)[1] for path in paths)
+
+
+def test_group_flights(make_flights):
+    groups = group_flights(make_flights(dub_lhr, lhr_kef))
+    assert groups[('airport', 'LHR')] == [0, 1]
+    assert groups[('airline', 'Aer Lingus')] == [0]
+    assert groups[('type', '757')] == [1]
+    assert groups[('registration', 'TF-FIA')] == [1]
+    assert len(groups) == 9
+
+
+def test_unchanged_pages_are_skipped(tmp_path, airports, make_flights, maps_drawn, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    flights = make_flights(dub_lhr, lhr_kef)
+    first = make_pages(flights, airports, 'site', processes=1)
+    assert len(first['written']) == 9 and len(maps_drawn) == 9
+    assert os.path.exists('site/airports/KEF.png')
+
+    again = make_pages(make_flights(dub_lhr, lhr_kef), airports, 'site', processes=1)
+    assert again['written'] == [] and len(again['unchanged']) == 9
+    assert len(maps_drawn) == 9
+
+
+def test_only_route_changes_redraw_maps(tmp_path, airports, make_flights, maps_drawn, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_pages(make_flights(dub_lhr, lhr_kef), airports, 'site', processes=1)
+    del maps_drawn[:]
+
+    # A new seat rewrites the pages of the flight, but keeps their maps
+    changed = make_pages(make_flights(dub_lhr.replace('17F', '18A'), lhr_kef), airports, 'site',
+                         processes=1)
+    assert names(changed['written']) == ['airlines/Aer-Lingus.html', 'airports/DUB.html',
+                                         'airports/LHR.html', 'registrations/EI-DVN.html',
+                                         'types/A320.html']
+    assert maps_drawn == []
+    with open('site/airports/DUB.html') as f:
+        assert 'DUB.png' in f.read()
+
+    # A new route redraws them, and removes the page of an airport left behind
+    rerouted = make_pages(make_flights(dub_lhr.replace('18A', '17F'), lhr_kef.replace('KEF', 'DUB')),
+                          airports, 'site', processes=1)
+    assert names(rerouted['removed']) == ['airports/KEF.html']
+    assert not os.path.exists('site/airports/KEF.png')
+    assert ['451'] in maps_drawn and ['182'] not in maps_drawn
+
+
+def test_airplane_age_is_refreshed(tmp_path, airports, make_flights, maps_drawn, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_pages(make_flights(dub_lhr, lhr_kef), airports, 'site', processes=1, maps=False)
+
+    monkeypatch.setattr(read_data, 'build_date', lambda: datetime.datetime(2061, 6, 14))
+    later = make_pages(make_flights(dub_lhr, lhr_kef), airports, 'site', processes=1, maps=False)
+    # Only the pages of the airplane whose first flight is known change
+    assert len(later['written']) == 5
+    with open('site/registrations/EI-DVN.html') as f:
+        assert '50 years' in f.read()
@@ -0,0 +1,25 @@
+import numpy as np
+
+from flight_mapper.plot import place_labels
+
+
+def test_place_labels_drops_overlapping_labels_in_order():
+    xy = np.array([[0.0, 0.0], [0.5, 0.0], [3.0, 0.0], [3.0, 0.5]])
+    widths = np.full(4, 1.0)
+    heights = np.full(4, 1.0)
+    assert place_labels(xy, widths, heights) == [0, 2]
+
+
+def test_place_labels_keeps_labels_which_only_touch():
+    xy = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    assert place_labels(xy, np.ones(3), np.ones(3)) == [0, 1, 2]
+
+
+def test_place_labels_finds_wide_labels_in_other_cells():
+    xy = np.array([[3.9, 0.0], [4.5, 0.0]])
+    widths = np.array([4.0, 1.0])
+    assert place_labels(xy, widths, np.ones(2)) == [0]
+
+
+def test_place_labels_empty():
+    assert place_labels(np.empty((0, 2)), np.empty(0), np.empty(0)) == []
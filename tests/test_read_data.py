@@ -0,0 +1,99 @@
+import datetime
+import warnings
+
+import pytest
+
+from flight_mapper import read_data
+from flight_mapper.read_data import Registry, gc_distance, parse_route_nodes
+
+
+details = dict(ln='123', first_flight='2011', engines=None, num_engines=2,
+               manufacturer='Airbus', type3='A320-200')
+
+
+def test_registry_shares_aircraft_with_the_same_details():
+    registry = Registry()
+    aircraft = registry.get_aircraft('EI-DVN', '4715', **details)
+    assert registry.get_aircraft('EI-DVN', '4715', **details) is aircraft
+    assert registry.aircraft == {('EI-DVN', '4715'): [aircraft]}
+    assert registry.get_carrier('Aer Lingus') is registry.get_carrier('Aer Lingus')
+
+
+def test_registry_keeps_lines_without_msn_apart():
+    registry = Registry()
+    known = registry.get_aircraft('EI-DVN', '4715', **details)
+    unknown = registry.get_aircraft('EI-DVN', None, **dict(details, ln=None))
+    assert unknown is not known
+    assert unknown.msn is None and unknown.ln is None
+    assert known.ln == '123'
+    assert registry.get_aircraft('EI-DVN', None, **dict(details, ln=None)) is unknown
+
+
+def test_registry_reports_conflicting_details():
+    registry = Registry()
+    first = registry.get_aircraft('EI-DVN', '4715', **details)
+    with pytest.warns(UserWarning, match='Conflicting type3 for airplane EI-DVN'):
+        second = registry.get_aircraft('EI-DVN', '4715', **dict(details, type3='A320-214'))
+    assert second is not first
+    assert registry.conflicts == [(first, second)]
+
+    # The conflicting details are interned too, and only reported once
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        again = registry.get_aircraft('EI-DVN', '4715', **dict(details, type3='A320-214'))
+    assert again is second
+    assert registry.aircraft[('EI-DVN', '4715')] == [first, second]
+    assert registry.conflicts == [(first, second)]
+
+
+def test_registry_missing_details_are_not_conflicts():
+    registry = Registry()
+    first = registry.get_aircraft('EI-DVN', '4715', **details)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        second = registry.get_aircraft('EI-DVN', '4715', **dict(details, ln=None))
+    assert second is not first and second.ln is None
+    assert registry.conflicts == []
+
+
+def test_registry_finds_every_flight_on_a_registration(make_flights):
+    registry = Registry()
+    flights = make_flights(
+        'date=20220618,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,registration=EI-DVN,msn=4715',
+        'date=20220617,mkt_cxr=Aer Lingus,number=183,route=LHR-DUB,registration=EI-DVN',
+        'date=20220619,mkt_cxr=Aer Lingus,number=184,route=DUB-LHR,registration=EI-DVN',
+        registry=registry)
+    assert flights[0].aircraft is not flights[1].aircraft
+    assert flights[1].aircraft is flights[2].aircraft
+    assert flights[1].msn is None
+    assert registry.registrations['EI-DVN'] == [flights[0].aircraft, flights[1].aircraft]
+    assert registry.tail_flights('EI-DVN') == [flights[1], flights[0], flights[2]]
+    assert registry.tail_flights('EI-XXX') == []
+
+
+def test_parse_route_nodes():
+    assert parse_route_nodes('DUB-sLHR-dSTN') == [('DUB', 'normal'), ('LHR', 'scheduled'),
+                                                  ('STN', 'diverted')]
+
+
+def test_derived_fields_are_computed_on_first_use(make_flights):
+    flight, = make_flights('date=20220618,mkt_cxr=Aer Lingus,number=182,route=DUB-sLHR-dLGW,'
+                           'registration=EI-DVN,first_flight=201105')
+    lazy = ['route_nodes', 'route', 'route_str', 'date', 'distance']
+    assert not any(name in flight.__dict__ for name in lazy)
+
+    dub, lgw = flight.airports['DUB'], flight.airports['LGW']
+    assert flight.route == [(dub, lgw)]
+    assert flight.distance == gc_distance(dub, lgw)
+    assert flight.date == datetime.datetime(2022, 6, 18)
+    assert '&#8628;' in flight.route_str and 'LGW' in flight.route_str
+    assert all(name in flight.__dict__ for name in lazy)
+    assert flight.route is flight.route
+
+
+def test_airplane_age_from_the_build_date(make_flights, monkeypatch):
+    monkeypatch.setattr(read_data, 'build_date', lambda: datetime.datetime(2021, 5, 14))
+    flight, = make_flights('date=20220618,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,'
+                           'registration=EI-DVN,first_flight=201105')
+    assert flight.first_flight_str == '2011 May'
+    assert flight.airplane_age == 10
@@ -0,0 +1,33 @@
+from flight_mapper.search import build_index, normalize, search_row, search_tokens
+
+
+dub_lhr = ('date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,type2=A320,'
+           'type3=A320-200,manufacturer=Airbus,registration=EI-DVN')
+lhr_kef = ('date=20220619,desig=FI,mkt_cxr=Icelandair,number=451,route=LHR-KEF,type2=757,'
+           'type3=757-200,manufacturer=Boeing,registration=TF-FIA')
+turned_back = ('date=20220620,desig=EI,mkt_cxr=Aer Lingus,number=184,route=DUB-sLHR,type2=A320,'
+               'type3=A320-200,manufacturer=Airbus,registration=EI-DVN')
+
+
+def test_normalize_strips_accents_and_punctuation():
+    assert normalize('Reykjavík, EI-DVN') == ['reykjavik', 'ei', 'dvn']
+
+
+def test_search_tokens(make_flights):
+    tokens = search_tokens(make_flights(dub_lhr)[0])
+    assert {'ei182', 'eidvn', 'dub', 'lhr', 'dublin', 'aer', 'lingus', 'a320'} <= tokens
+
+
+def test_search_row_of_flight_which_never_landed_elsewhere(make_flights):
+    flight = make_flights(turned_back)[0]
+    assert flight.route == []
+    assert search_row(flight)[2] == 'DUB'
+    assert 'dub' in search_tokens(flight)
+
+
+def test_build_index_delta_encodes_row_ids(make_flights):
+    shards = build_index(make_flights(dub_lhr, lhr_kef, turned_back, dub_lhr))
+    assert shards['lh']['lhr'] == [0, 1, 2]
+    assert shards['du']['dub'] == [0, 2, 1]
+    assert shards['ke']['kef'] == [1]
+    assert all(token[:2] == prefix for prefix, tokens in shards.items() for token in tokens)
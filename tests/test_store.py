@@ -0,0 +1,109 @@
+import os
+import sqlite3
+
+import pytest
+
+from flight_mapper.store import FlightStore
+
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+lines = [
+    'date=20220618,desig=EI,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,type2=A320,'
+    'type3=A320-200,manufacturer=Airbus,registration=EI-DVN,msn=4715',
+    'date=20220617,desig=FR,mkt_cxr=Ryanair,number=667,route=BHX-DUB,type2=737-800,'
+    'type3=737-800,manufacturer=Boeing,registration=EI-ENX,msn=40305',
+    'date=20220605,desig=DY,mkt_cxr=Norwegian Air Shuttle,number=1340,route=TRD-LGW,'
+    'type2=737-800,type3=737-800,manufacturer=Boeing,registration=LN-NGS,msn=39029',
+]
+
+
+def write_lines(path, rows):
+    with open(path, mode='w') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FlightStore(str(tmp_path / 'flights.db'))
+    store.load_airports(os.path.join(repo, 'data', 'airports.csv'))
+    yield store
+    store.close()
+
+
+def test_update_inserts_new_lines(store, tmp_path):
+    path = tmp_path / 'flights.txt'
+    write_lines(path, lines)
+    assert store.update(path) == (3, 0)
+    assert [flight.number for flight in store.query()] == ['182', '667', '1340']
+
+
+def test_update_only_touches_changed_lines(store, tmp_path):
+    path = tmp_path / 'flights.txt'
+    write_lines(path, lines)
+    store.update(path)
+    first = store.query(registration='EI-DVN')[0]
+
+    write_lines(path, lines)
+    assert store.update(path) == (0, 0)
+
+    changed = lines[1].replace('number=667', 'number=668')
+    write_lines(path, [changed, lines[0]])
+    assert store.update(path) == (1, 2)
+    assert [flight.number for flight in store.query()] == ['668', '182']
+    # The unchanged flight keeps its parsed object, at its new position
+    assert store.query(registration='EI-DVN')[0] is first
+
+
+def test_update_removes_flights_from_shared_objects(store, tmp_path):
+    path = tmp_path / 'flights.txt'
+    write_lines(path, lines)
+    store.update(path)
+    carrier = store.query(registration='EI-ENX')[0].carrier
+    assert len(carrier.flights) == 1
+
+    write_lines(path, [lines[0], lines[2]])
+    store.update(path)
+    assert carrier.flights == []
+
+
+def test_query_filters(store, tmp_path):
+    path = tmp_path / 'flights.txt'
+    write_lines(path, lines)
+    store.update(path)
+
+    numbers = lambda flights: [flight.number for flight in flights]
+    assert numbers(store.query(airport='DUB')) == ['182', '667']
+    assert numbers(store.query(origin='DUB')) == ['182']
+    assert numbers(store.query(destination='DUB')) == ['667']
+    assert numbers(store.query(carrier='Ryanair')) == ['667']
+    assert numbers(store.query(aircraft='737-800')) == ['667', '1340']
+    assert numbers(store.query(start='20220606', end='20220617')) == ['667']
+    assert numbers(store.query(airport='DUB', aircraft='A320')) == ['182']
+
+
+def test_update_keeps_repeated_lines(store, tmp_path):
+    path = tmp_path / 'flights.txt'
+    write_lines(path, [lines[0], lines[1], lines[0]])
+    assert store.update(path) == (3, 0)
+    assert [flight.number for flight in store.query()] == ['182', '667', '182']
+
+    write_lines(path, [lines[1], lines[0]])
+    assert store.update(path) == (0, 1)
+    assert [flight.number for flight in store.query()] == ['667', '182']
+
+
+def test_older_flights_tables_are_rebuilt(tmp_path):
+    db = str(tmp_path / 'flights.db')
+    connection = sqlite3.connect(db)
+    connection.execute('CREATE TABLE flights (id INTEGER PRIMARY KEY, line TEXT NOT NULL UNIQUE)')
+    connection.execute("INSERT INTO flights (line) VALUES ('stale')")
+    connection.commit()
+    connection.close()
+
+    store = FlightStore(db)
+    store.load_airports(os.path.join(repo, 'data', 'airports.csv'))
+    path = tmp_path / 'flights.txt'
+    write_lines(path, lines)
+    assert store.update(path) == (3, 0)
+    store.close()
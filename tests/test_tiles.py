@@ -0,0 +1,89 @@
+import copy
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from flight_mapper.tiles import _margin, _render_tile, render_tiles, tile_size, tiles_for_geometry
+
+
+dub_lhr = 'date=20220618,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,registration=EI-DVN'
+jfk_lax = 'date=20220619,mkt_cxr=Delta Air Lines,number=451,route=JFK-LAX,registration=N123DL'
+
+
+def point(zoom, x, y):
+    """A point at pixel (x, y) of the top left tile of a zoom level."""
+    return [np.array([[x / tile_size / 2 ** zoom, y / tile_size / 2 ** zoom]])]
+
+
+def alpha(path):
+    return np.asarray(Image.open(path).convert('RGBA'))[:, :, 3]
+
+
+def test_points_near_an_edge_touch_both_tiles():
+    assert tiles_for_geometry(point(1, 128, 128), 1) == {(0, 0)}
+    assert tiles_for_geometry(point(1, tile_size - 6, 128), 1) == {(0, 0), (1, 0)}
+    assert tiles_for_geometry(point(1, tile_size - 6, tile_size - 6), 1) == {
+        (0, 0), (1, 0), (0, 1), (1, 1)}
+
+
+def test_markers_fit_within_the_margin(tmp_path):
+    # A marker just further from the edge than the margin stops short of it
+    x = tile_size - np.ceil(_margin) - 1
+    path = str(tmp_path / 'far.png')
+    _render_tile((1, 0, 0, [], point(1, x, 128), path))
+    assert tiles_for_geometry(point(1, x, 128), 1) == {(0, 0)}
+    assert alpha(path)[:, -1].max() == 0
+
+    # and one 6px from the edge is drawn on both tiles
+    for tile_x in (0, 1):
+        path = str(tmp_path / f'near-{tile_x}.png')
+        _render_tile((1, tile_x, 0, [], point(1, tile_size - 6, 128), path))
+        assert alpha(path)[:, -1 if tile_x == 0 else 0].max() > 0
+
+
+def tile_paths(outdir, key):
+    with open(os.path.join(outdir, 'tiles.json')) as f:
+        tiles = json.load(f)['features'][key]['tiles']
+    return {os.path.join(outdir, *tile.split('/')) + '.png' for tile in tiles}
+
+
+def test_render_tiles_only_redraws_dirty_tiles(tmp_path, airports, make_flights):
+    outdir = str(tmp_path / 'tiles')
+    flights = make_flights(dub_lhr, jfk_lax)
+    first = render_tiles(flights, outdir, zooms=range(5), processes=1)
+    assert first['written'] and not first['removed']
+    assert render_tiles(flights, outdir, zooms=range(5), processes=1) == {'written': [], 'removed': []}
+    old_lax = tile_paths(outdir, 'airport:LAX')
+
+    # Moving an airport redraws the tiles it left and the tiles it moved to,
+    # and no others
+    moved_airports = dict(airports)
+    lax = moved_airports['LAX'] = copy.copy(airports['LAX'])
+    lax.lon, lax.lat = lax.lon + 10, lax.lat - 10
+    moved = render_tiles(make_flights(dub_lhr, jfk_lax, airports=moved_airports), outdir,
+                         zooms=range(5), processes=1)
+    changed = set(moved['written']) | set(moved['removed'])
+    assert old_lax <= changed
+    assert tile_paths(outdir, 'airport:LAX') <= changed
+    assert not tile_paths(outdir, 'airport:DUB') <= changed
+
+    # Removing a route clears the tiles only it touched
+    fewer = render_tiles(flights[:1], outdir, zooms=range(5), processes=1)
+    assert fewer['removed']
+    assert not any(os.path.exists(path) for path in fewer['removed'])
+
+
+def test_render_tiles_follows_the_zoom_levels(tmp_path, make_flights):
+    outdir = str(tmp_path / 'tiles')
+    flights = make_flights(dub_lhr)
+    render_tiles(flights, outdir, zooms=range(2), processes=1)
+
+    more = render_tiles(flights, outdir, zooms=range(3), processes=1)
+    assert {path.split(os.sep)[-3] for path in more['written']} == {'2'}
+
+    fewer = render_tiles(flights, outdir, zooms=range(1), processes=1)
+    assert not fewer['written']
+    assert {path.split(os.sep)[-3] for path in fewer['removed']} == {'1', '2'}
+    assert sorted(os.listdir(outdir)) == ['0', 'tiles.json']
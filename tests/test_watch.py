@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+import pytest
+
+from flight_mapper import watch
+from flight_mapper.build import site_graph
+from flight_mapper.watch import Watcher, affected_tasks, route_signature
+
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+dub_lhr = 'date=20220618,mkt_cxr=Aer Lingus,number=182,route=DUB-LHR,registration=EI-DVN,seat=17F'
+
+
+def test_route_signature_ignores_everything_but_routes(make_flights):
+    before = route_signature(make_flights(dub_lhr))
+    assert route_signature(make_flights(dub_lhr.replace('17F', '2A'))) == before
+    assert route_signature(make_flights(dub_lhr.replace('DUB-LHR', 'DUB-LGW'))) != before
+
+
+def test_affected_tasks_follow_the_graph(tmp_path):
+    path = lambda name: os.path.join(repo, name)
+    graph = site_graph(path('flights.txt'), path('data/airports.csv'), str(tmp_path / 'public'),
+                       root=repo)
+
+    flights = affected_tasks(graph, {path('flights.txt')})
+    assert {'flights', 'network', 'html', 'pages', 'geojson', 'search', 'tiles',
+            'map_earth', 'map_europe', 'map_america'} <= flights
+    assert not {'airports', 'geometry', 'assets'} & flights
+
+    airports = affected_tasks(graph, {path('data/airports.csv')})
+    assert airports == flights | {'airports'}
+
+    assert affected_tasks(graph, {path('style.css')}) == {'assets'}
+    assert affected_tasks(graph, {path('README.md')}) == set()
+
+
+def change_soon(path, text, delay=0.3):
+    def write():
+        time.sleep(delay)
+        with open(path, mode='w') as f:
+            f.write(text)
+    threading.Thread(target=write, daemon=True).start()
+
+
+def test_watcher_polls_for_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch, 'inotify_simple', None)
+    path = tmp_path / 'flights.txt'
+    path.write_text('one')
+    watcher = Watcher([str(path)], interval=0.05)
+    change_soon(path, 'two')
+    assert watcher.wait() == {str(path)}
+
+
+def test_watcher_ignores_other_files_in_the_directory(tmp_path):
+    pytest.importorskip('inotify_simple')
+    path = tmp_path / 'flights.txt'
+    path.write_text('one')
+    watcher = Watcher([str(path)], interval=0.05)
+    change_soon(tmp_path / 'other.txt', 'ignored', delay=0.1)
+    change_soon(path, 'two', delay=0.5)
+    assert watcher.wait() == {str(path)}
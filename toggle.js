@@ -1,32 +1,45 @@
-function toggle(elementId,element2Id) {
-    var div = document.getElementById(elementId);
-    var span = document.getElementById(element2Id);
-    if(div.style.display == "block") {
-        div.style.display = "none";
-        span.style.borderTop = "8px solid #337ab8";
-        span.style.borderBottom = "none";
+// A single click handler for the whole page. Clickable elements say what
+// they open with data- attributes, so the cost of a click does not depend on
+// how many rows the page has:
+//   data-section="id"  open or close the section with that id
+//   data-row="id"      open or close the log details row with that id
+//   data-expand="n"    open or close the n rows following this one
+
+function flipArrow(element) {
+    var span = element.querySelector('span');
+    if (span === null) {
+        return;
     }
-    else {
-        div.style.display = "block";
-        span.style.borderTop = "none";
-        span.style.borderBottom = "8px solid #337ab8";
+    var swaps = {uparrow: 'downarrow', downarrow: 'uparrow',
+                 uparrowk: 'downarrowk', downarrowk: 'uparrowk'};
+    for (var name in swaps) {
+        if (span.classList.contains(name)) {
+            span.classList.replace(name, swaps[name]);
+            return;
+        }
     }
 }
 
+document.addEventListener('click', function (event) {
+    var element = event.target.closest('[data-section],[data-row],[data-expand]');
+    if (element === null) {
+        return;
+    }
 
-function toggle2(elementId,element2Id) {
-    var div = document.getElementById(elementId);
-    var span = document.getElementById(element2Id);
-    if(div.style.display == "table-row") {
-        // window.alert("closing");
-        // div.style.display = "none";
-        span.style.borderTop = "7px solid #000";
-        span.style.borderBottom = "none";
+    if (element.dataset.section !== undefined) {
+        var div = document.getElementById(element.dataset.section);
+        div.style.display = getComputedStyle(div).display == 'none' ? 'block' : 'none';
+        flipArrow(element);
+    }
+    else if (element.dataset.row !== undefined) {
+        document.getElementById(element.dataset.row).classList.toggle('row_closed');
+        flipArrow(element);
     }
     else {
-        // window.alert("opening");
-        // div.style.display = "inline-block";
-        span.style.borderTop = "none";
-        span.style.borderBottom = "7px solid #000";
+        var row = element.nextElementSibling;
+        for (var n = parseInt(element.dataset.expand); n > 0 && row !== null; n--) {
+            row.classList.toggle('row_closed');
+            row = row.nextElementSibling;
+        }
     }
-}
+});